@@ -0,0 +1,46 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+Benchmarks of physicsfront.mqca, for airspeed velocity (asv); see
+``asv.conf.json`` at the top of the repository.
+
+All benchmarks run locally (on the Aer simulator, or analytically), without
+network access or an IBM account.  Each ``time_*`` benchmark has a
+``peakmem_*`` twin for the peak memory.
+
+To record a baseline and compare against it, first tag the commit to
+compare against (once; here, the current commit, but any commit or ref,
+such as ``master~3``, will do)::
+
+    git tag bench-baseline HEAD
+
+and then::
+
+    asv run bench-baseline^!               # store the baseline results
+    asv continuous bench-baseline HEAD     # run both and report changes
+    asv compare bench-baseline HEAD        # compare stored results
+
+The results are kept in ``asv-results`` (one JSON file per commit, machine
+and environment), which is meant to be committed, so that the stored
+baseline goes along with the repository; the environments and HTML report
+are kept in ``.asv``, which is not.  Commits before this suite was added
+lack some of the benchmarked functions, whose benchmarks then fail there.
+
+and, for a quick run against the current environment (no baseline)::
+
+    asv run --python=same --quick
+"""
@@ -0,0 +1,59 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+Benchmarks of the ``qc_*`` circuit builders, with and without the circuit
+cache.
+"""
+
+import physicsfront.qiskit # pylint: disable=E0401,W0611 (for initialize)
+from physicsfront import mqca
+
+class TimeBuilders (object): # <<<
+
+    params = (['qc_bb84', 'qc_eavesdrop_qubit', 'qc_entangle_two_qubits',
+               'qc_for_random_bits', 'qc_measure_qubit'],
+              [False, True])
+    param_names = ['builder', 'cached']
+
+    def setup (self, builder, cached):
+        mqca.circuit_cache (enabled = cached, clear = True)
+        self.builder = getattr (mqca, builder)
+        if cached:
+            self.builder () # warm up
+
+    def teardown (self, builder, cached): # pylint: disable=W0613
+        mqca.circuit_cache (enabled = True, clear = True)
+
+    def time_build (self, builder, cached): # pylint: disable=W0613
+        self.builder ()
+
+# >>>
+class TimeBB84Pairs (object): # <<<
+
+    params = [1, 4, 16]
+    param_names = ['pairs']
+
+    def setup (self, pairs): # pylint: disable=W0613
+        mqca.circuit_cache (enabled = False, clear = True)
+
+    def teardown (self, pairs): # pylint: disable=W0613
+        mqca.circuit_cache (enabled = True, clear = True)
+
+    def time_build (self, pairs):
+        mqca.qc_bb84 (pairs = pairs)
+
+# >>>
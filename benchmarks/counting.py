@@ -0,0 +1,91 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+Benchmarks of counting over the memory of a finalized run, with and without
+a predicate, against :func:`physicsfront.qiskit.gather_counts` over the
+memory strings.
+"""
+
+import physicsfront.qiskit # pylint: disable=E0401,W0611 (for initialize)
+from physicsfront import mqca
+from physicsfront.mqca import experiment
+
+STRINGS_MAX_SHOTS = 10 ** 5 # gather_counts over strings is slow; skipped
+
+CLSPECS = ('amar_receives', 'juan_receives')
+PREDICATE = 'amar_prep_bit| == juan_prep_bit|'
+
+class Counts (object): # <<<
+
+    params = ([10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7], [False, True])
+    param_names = ['shots', 'predicate']
+    timeout = 300
+
+    def setup (self, shots, predicate): # pylint: disable=W0613
+        self.run = experiment.run (mqca.qc_bb84 (), simulate = 'analytic',
+                                   shots = shots)
+        self.run.finalize ()
+        self.run.bits # pylint: disable=W0104 (not timed)
+
+    def _counts (self, predicate):
+        self.run._counts_cache.clear () # pylint: disable=W0212
+        self.run.counts (clspecs = CLSPECS,
+                         predicate = PREDICATE if predicate else None)
+
+    def time_counts (self, shots, predicate): # pylint: disable=W0613
+        self._counts (predicate)
+
+    def peakmem_counts (self, shots, predicate): # pylint: disable=W0613
+        self._counts (predicate)
+
+    def time_gather_counts_3_queries (self, shots, # pylint: disable=W0613
+                                      predicate):
+        self.run._counts_cache.clear () # pylint: disable=W0212
+        self.run.gather_counts ([
+                (CLSPECS, PREDICATE if predicate else None, None),
+                (CLSPECS [: 1], None, None),
+                (('evil_hacker_listens', 'juan_receives'), None, None)])
+
+# >>>
+class CountsStrings (object): # <<<
+
+    params = ([10 ** 4, 10 ** 5], [False, True])
+    param_names = ['shots', 'predicate']
+    timeout = 300
+
+    def setup (self, shots, predicate): # pylint: disable=W0613
+        if shots > STRINGS_MAX_SHOTS:
+            raise NotImplementedError # asv: skip
+        run = experiment.run (mqca.qc_bb84 (), simulate = 'analytic',
+                              shots = shots)
+        run.finalize ()
+        self.result = run.result
+
+    def _gather_counts (self, predicate):
+        # pylint: disable=E0401
+        from physicsfront.qiskit import gather_counts
+        gather_counts (self.result, * CLSPECS,
+                       predicate = PREDICATE if predicate else None)
+
+    def time_gather_counts (self, shots, predicate): # pylint: disable=W0613
+        self._gather_counts (predicate)
+
+    def peakmem_gather_counts (self, shots, # pylint: disable=W0613
+                               predicate):
+        self._gather_counts (predicate)
+
+# >>>
@@ -0,0 +1,97 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+Benchmarks of :func:`physicsfront.mqca.experiment.run` (submission up to
+the finalized run) and of :meth:`~physicsfront.mqca.experiment.Run.finalize`
+on the local simulators.
+"""
+
+import physicsfront.qiskit # pylint: disable=E0401,W0611 (for initialize)
+from physicsfront import mqca
+from physicsfront.mqca import experiment
+
+AER_MAX_SHOTS = 10 ** 5 # larger runs on Aer take minutes; skipped
+
+def _simulate (simulate, shots): # <<<
+    if simulate == 'aer':
+        if shots > AER_MAX_SHOTS:
+            raise NotImplementedError # asv: skip
+        return True
+    return simulate
+# >>>
+
+class Run (object): # <<<
+
+    params = ([10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7],
+              ['aer', 'analytic'])
+    param_names = ['shots', 'simulate']
+    timeout = 600
+
+    def setup (self, shots, simulate):
+        self.simulate = _simulate (simulate, shots)
+        self.qc = mqca.qc_bb84 ()
+
+    def _run (self, shots):
+        experiment.run (self.qc, simulate = self.simulate, shots = shots
+                        ).wait (interval = .01).counts ()
+
+    def time_run (self, shots, simulate): # pylint: disable=W0613
+        self._run (shots)
+
+    def peakmem_run (self, shots, simulate): # pylint: disable=W0613
+        self._run (shots)
+
+# >>>
+class Finalize (object): # <<<
+
+    params = ([10 ** 3, 10 ** 5, 10 ** 7], ['aer', 'analytic'],
+              [False, True])
+    param_names = ['shots', 'simulate', 'compact']
+    timeout = 600
+
+    def setup (self, shots, simulate, compact): # pylint: disable=W0613
+        self.run = experiment.run (mqca.qc_bb84 (),
+                                   simulate = _simulate (simulate, shots),
+                                   shots = shots)
+        self.run.job.result () # not timed
+
+    def _finalize (self, compact):
+        self.run.finalize (redo = True, compact = compact)
+        self.run.memory # pylint: disable=W0104
+
+    def time_finalize (self, shots, simulate, compact): # pylint: disable=W0613
+        self._finalize (compact)
+
+    def peakmem_finalize (self, shots, simulate, # pylint: disable=W0613
+                          compact):
+        self._finalize (compact)
+
+# >>>
+class RandomBits (object): # <<<
+
+    params = ([10 ** 3, 10 ** 4, 10 ** 5], ['initialize', 'gates'])
+    param_names = ['shots', 'prep']
+    timeout = 600
+
+    def setup (self, shots, prep): # pylint: disable=W0613
+        self.qc = mqca.qc_for_random_bits (qubits = 8, prep = prep)
+
+    def time_run (self, shots, prep): # pylint: disable=W0613
+        experiment.run (self.qc, shots = shots
+                        ).wait (interval = .01).bits # pylint: disable=W0106
+
+# >>>
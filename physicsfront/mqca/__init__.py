@@ -15,14 +15,125 @@
 ##
 
 from . import experiment
+from ._cache import LRUCache as _LRUCache
 
-def qc_bb84 (source_name = 'secret_quantume_key', party1 = 'amar', # <<<
+_circuit_cache = _LRUCache (maxsize = 128)
+
+def _cached (builder): # <<<
+    """
+    Decorates a ``qc_*`` builder so that the circuits it builds are memoized
+    in ``_circuit_cache``, keyed on the normalized arguments (the same values
+    that end up in ``_dargs``).
+
+    The cached circuit is a template that is never handed out: every call
+    returns a copy of it (with its own ``_dargs`` and a fresh automatic
+    name, as a newly built circuit would have), so that callers may modify
+    the returned circuit freely.
+    """
+    import functools, inspect
+    from qiskit import QuantumCircuit # pylint: disable=E0611
+    from ._cache import freeze
+    signature = inspect.signature (builder)
+    @functools.wraps (builder)
+    def wrapper (* args, ** kwargs):
+        cache = _circuit_cache
+        if not cache.enabled:
+            return builder (* args, ** kwargs)
+        bound = signature.bind (* args, ** kwargs)
+        bound.apply_defaults ()
+        try:
+            key = (builder.__name__, freeze (bound.arguments))
+        except TypeError: # unhashable argument; don't cache
+            return builder (* args, ** kwargs)
+        template = cache.get (key)
+        if template is None:
+            template = builder (* args, ** kwargs)
+            cache.put (key, template)
+        qc = template.copy (name = QuantumCircuit ().name)
+        qc._dargs = dict (template._dargs)
+        return qc
+    return wrapper
+# >>>
+def circuit_cache (enabled = None, maxsize = None, clear = False): # <<<
+    """
+    Configures and inspects the cache of circuits built by the ``qc_*``
+    functions of this module.
+
+    Circuits are cached by their (normalized) arguments, with least recently
+    used circuits evicted once more than ``maxsize`` circuits are cached.
+    Each call of a ``qc_*`` function returns a copy of the cached circuit.
+
+    :param enabled:  If given, turns the cache on (true value) or off (false
+        value).  Turning the cache off does not clear it.
+
+    :param maxsize:  If given, sets the maximum number of cached circuits.
+
+    :param clear:  If true, all cached circuits and statistics are cleared.
+
+    :returns:  A :func:`dict` with the keys ``'enabled'``, ``'maxsize'``,
+        ``'size'``, ``'hits'``, and ``'misses'``.
+    """
+    cache = _circuit_cache
+    if enabled is not None:
+        cache.enabled = bool (enabled)
+    if maxsize is not None:
+        cache.maxsize = maxsize
+        cache.trim ()
+    if clear:
+        cache.clear ()
+    return cache.info ()
+# >>>
+# <<< def qc_bb84 (source_name = 'secret_quantume_key', party1 = 'amar', ...
+@_cached
+def qc_bb84 (source_name = 'secret_quantume_key', party1 = 'amar',
              party2 = 'juan', party3 = 'evil_hacker', basis12 = 'random',
-             barrier = True):
+             barrier = True, kind = 1, pairs = 1, prep = 'initialize'):
+    """
+    Creates a quantum circuit for the BB84 experiment: the two qubits of an
+    entangled pair (see :func:`qc_entangle_two_qubits` for ``kind``) are
+    measured by ``party1`` and ``party2`` (see :func:`qc_measure_qubit` for
+    ``basis12``), while ``party3``, unless a false value is given, eavesdrops
+    on the qubit of ``party2`` (see :func:`qc_eavesdrop_qubit`).
+
+    :param basis12:  The ``basis`` of both ``party1`` and ``party2``, or a
+        2-tuple of their bases, such as ``('z', 'x')``.
+
+    :param pairs:  The number of independent entangled pairs (each with its
+        own measurements and eavesdropping), so that each shot yields
+        ``pairs`` raw key bits.  If more than 1, the names of the registers
+        of pair ``p`` (from 0) get the suffix ``_<p>`` after
+        ``source_name`` and the party names, as in ``'amar_0_receives'``.
+
+    :param prep:  How qubits are prepared, ``'initialize'`` or ``'gates'``
+        (see :func:`qc_entangle_two_qubits` and :func:`qc_measure_qubit`).
+    """
     dargs = dict (** locals ())
-    qc = qc_entangle_two_qubits (name = source_name)
-    qc1 = qc_measure_qubit (name = party1, basis = basis12)
-    qc2 = qc_measure_qubit (name = party2, basis = basis12)
+    if pairs != 1:
+        if not isinstance (pairs, int) or pairs < 1:
+            raise ValueError (f'Invalid value {pairs!r} passed for pairs.')
+        from qiskit import QuantumCircuit
+        blocks = list (qc_bb84 (source_name = f'{source_name}_{p}',
+                                party1 = f'{party1}_{p}',
+                                party2 = f'{party2}_{p}',
+                                party3 = party3 and f'{party3}_{p}',
+                                basis12 = basis12, barrier = barrier,
+                                kind = kind, prep = prep)
+                       for p in range (pairs))
+        ans = QuantumCircuit (* (r for b in blocks for r in b.qregs),
+                              * (r for b in blocks for r in b.cregs))
+        for b in blocks:
+            ans.compose (b, qubits = b.qubits, clbits = b.clbits,
+                         inplace = True)
+        ans._dargs = dargs
+        return ans
+    if isinstance (basis12, str):
+        basis1 = basis2 = basis12
+    else:
+        basis1, basis2 = basis12
+    qc = qc_entangle_two_qubits (name = source_name, kind = kind,
+                                 prep = prep)
+    qc1 = qc_measure_qubit (name = party1, basis = basis1, prep = prep)
+    qc2 = qc_measure_qubit (name = party2, basis = basis2, prep = prep)
     qc3 = qc_eavesdrop_qubit (name = party3) if party3 else None
     instructions = []
     if qc3:
@@ -34,7 +145,9 @@ def qc_bb84 (source_name = 'secret_quantume_key', party1 = 'amar', # <<<
     ans._dargs = dargs
     return ans
 # >>>
-def qc_eavesdrop_qubit (name = 'evil_hacker'): # <<<
+# <<< def qc_eavesdrop_qubit (name = 'evil_hacker'):
+@_cached
+def qc_eavesdrop_qubit (name = 'evil_hacker'):
     """
     Creates a quantum circuit to measure a qubit.
 
@@ -51,8 +164,10 @@ def qc_eavesdrop_qubit (name = 'evil_hacker'): # <<<
     qc._dargs = dargs
     return qc
 # >>>
-def qc_entangle_two_qubits (name = 'secret_quantume_key', kind = 1, # <<<
-                            statevector = False):
+# <<< def qc_entangle_two_qubits (name = 'secret_quantume_key', kind = 1, ...
+@_cached
+def qc_entangle_two_qubits (name = 'secret_quantume_key', kind = 1,
+                            statevector = False, prep = 'initialize'):
     """
     Creates a quantum circuit with entangled two qubits. The entanglement
     will be the maximum entanglement if ``kind`` is left as the default
@@ -76,6 +191,12 @@ def qc_entangle_two_qubits (name = 'secret_quantume_key', kind = 1, # <<<
 
     :param statevector:  Only for simulator run.  The state vector will be
         saved after initialization.
+
+    :param prep:  How the two qubits are put in the basis state that the
+        Bell state of ``kind`` is entangled from: ``'initialize'`` (default)
+        uses ``initialize``, which resets the qubits first, while ``'gates'``
+        applies an ``x`` gate to each (fresh) qubit that must be flipped,
+        which gives the same state with fewer and native operations.
     """
     dargs = dict (** locals ())
     from qiskit import QuantumCircuit, QuantumRegister # pylint: disable=W0406,E0611
@@ -107,8 +228,15 @@ def qc_entangle_two_qubits (name = 'secret_quantume_key', kind = 1, # <<<
         iv1 = (0, 1)
     else:
         raise ValueError (f'Invalid value {kind!r} passed for kind.')
-    qc.initialize (iv0, 0) # pylint: disable=E1101
-    qc.initialize (iv1, 1) # pylint: disable=E1101
+    if prep == 'initialize':
+        qc.initialize (iv0, 0) # pylint: disable=E1101
+        qc.initialize (iv1, 1) # pylint: disable=E1101
+    elif prep == 'gates':
+        for i, iv in enumerate ((iv0, iv1)):
+            if iv [1]:
+                qc.x (i)
+    else:
+        raise ValueError (f'Invalid value {prep!r} passed for prep.')
     qc.h (0)
     qc.cx (0, 1)
     if statevector:
@@ -120,11 +248,14 @@ def qc_entangle_two_qubits (name = 'secret_quantume_key', kind = 1, # <<<
     qc._dargs = dargs
     return qc
 # >>>
-def qc_for_random_bits (name = 'control', measure = 'random', # <<<
-                        statevector = False):
+# <<< def qc_for_random_bits (name = 'control', measure = 'random', ...
+@_cached
+def qc_for_random_bits (name = 'control', measure = 'random',
+                        statevector = False, qubits = 1, prep = 'initialize'):
     """
-    Creates a quantum circuit consisting of one qubit, which is maximally
-    superposed to create a sequence of random bits when measured.
+    Creates a quantum circuit consisting of one qubit (or ``qubits``
+    qubits), which is maximally superposed to create a sequence of random
+    bits when measured.
 
     :param name: The name of the quantum register for the qubit.  To disable
         the register, pass a false value.
@@ -138,28 +269,42 @@ def qc_for_random_bits (name = 'control', measure = 'random', # <<<
         pass a true value which is _not_ a string.
 
         To disable the measurement, pass any false value.
+
+    :param qubits:  The number of qubits (and of random bits per shot).  The
+        registers are of this size.
+
+    :param prep:  ``'initialize'`` (default) to initialize each qubit to
+        ``|0>`` before the Hadamard gate, or ``'gates'`` to apply the
+        Hadamard gate to the fresh qubits right away.  The latter saves the
+        resets, and it is much faster to simulate.
     """
     dargs = dict (** locals ())
     from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister # pylint: disable=W0406,E0611
     if statevector:
         # This is for 'qc.save_statevector'.
         from qiskit.providers.aer import Aer # pylint: disable=E0401,E0611,W0611
+    if not isinstance (qubits, int) or qubits < 1:
+        raise ValueError (f'Invalid value {qubits!r} passed for qubits.')
+    if prep not in ('initialize', 'gates'):
+        raise ValueError (f'Invalid value {prep!r} passed for prep.')
     if name:
-        args = [QuantumRegister (1, name = name)]
+        args = [QuantumRegister (qubits, name = name)]
     else:
-        args = [1]
+        args = [qubits]
     measure_src = args [0]
     if measure:
         if type (measure) == str:
-            args.append (ClassicalRegister (1, name = measure))
+            args.append (ClassicalRegister (qubits, name = measure))
             measure_tgt = args [-1]
         else:
             measure_tgt = None
     else:
         measure_src = None
     qc = QuantumCircuit (* args)
-    qc.initialize ('[100 %, 0 %]', 0) # pylint: disable=E1101
-    qc.h (0)
+    if prep == 'initialize':
+        for i in range (qubits):
+            qc.initialize ('[100 %, 0 %]', i) # pylint: disable=E1101
+    qc.h (range (qubits))
     if statevector:
         qc.save_statevector () # pylint: disable=E1101
     if measure_src:
@@ -170,7 +315,9 @@ def qc_for_random_bits (name = 'control', measure = 'random', # <<<
     qc._dargs = dargs
     return qc
 # >>>
-def qc_measure_qubit (name = 'amal', basis = 'random'): # <<<
+# <<< def qc_measure_qubit (name = 'amal', basis = 'random', ...
+@_cached
+def qc_measure_qubit (name = 'amal', basis = 'random', prep = 'initialize'):
     """
     Creates a quantum circuit for measuring a qubit using basis 'z', 'x', a
     random choice between the two.
@@ -184,16 +331,24 @@ def qc_measure_qubit (name = 'amal', basis = 'random'): # <<<
     - The first classical register of length 1, to store that random bit.  When
     this bit is true, then the 'x' basis applies, while when this bit is
     false, then the 'z' basis applies.
+
+    :param prep:  Only for ``basis == 'random'``.  The qubit for the random
+        bit is initialized to ``|0>`` with ``initialize`` (``'initialize'``,
+        the default), or taken as the fresh qubit it is (``'gates'``), so
+        that only native gates remain.
     """
     dargs = dict (** locals ())
     from qiskit import QuantumRegister, ClassicalRegister, QuantumCircuit
+    if prep not in ('initialize', 'gates'):
+        raise ValueError (f'Invalid value {prep!r} passed for prep.')
     qr1 = QuantumRegister (1, name = name + '_qubit')
     cr1 = ClassicalRegister (1, name = name + '_receives')
     if basis == 'random':
         qr1c = QuantumRegister (1, name = name + '_prepares')
         cr1c = ClassicalRegister (1, name = name + '_prep_bit')
         qc = QuantumCircuit (qr1, qr1c, cr1c, cr1)
-        qc.initialize ('[100 %, 0 %]', qr1c) # pylint: disable=E1101
+        if prep == 'initialize':
+            qc.initialize ('[100 %, 0 %]', qr1c) # pylint: disable=E1101
         qc.h (qr1c)
         qc.measure (qr1c, cr1c)
         qc.h (qr1).c_if (cr1c, 1) # dynamic circuit
@@ -0,0 +1,108 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+class LRUCache (object): # <<<
+
+    """
+    A small thread-safe mapping with bounded size and least-recently-used
+    eviction, which also keeps hit/miss statistics.
+
+    ``maxsize`` may be ``None`` for an unbounded cache, or 0 to effectively
+    disable storing anything.
+    """
+
+    def __init__ (self, maxsize = 128, enabled = True):
+        from collections import OrderedDict
+        from threading import RLock
+        self._data = OrderedDict ()
+        self._lock = RLock ()
+        self.enabled = enabled
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+
+    def __len__ (self):
+        return len (self._data)
+
+    def clear (self, stats = True):
+        with self._lock:
+            self._data.clear ()
+            if stats:
+                self.hits = self.misses = 0
+
+    def get (self, key, default = None):
+        """
+        Returns the value for ``key`` (marking it as the most recently used)
+        or ``default`` if ``key`` is not in the cache.  Either way, hit/miss
+        statistics are updated.
+        """
+        with self._lock:
+            try:
+                value = self._data [key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end (key)
+            self.hits += 1
+            return value
+
+    def info (self):
+        """
+        Returns a :func:`dict` with the keys ``'enabled'``, ``'maxsize'``,
+        ``'size'``, ``'hits'``, and ``'misses'``.
+        """
+        with self._lock:
+            return {'enabled': self.enabled, 'maxsize': self.maxsize,
+                    'size': len (self._data), 'hits': self.hits,
+                    'misses': self.misses}
+
+    def put (self, key, value):
+        with self._lock:
+            self._data [key] = value
+            self._data.move_to_end (key)
+            self.trim ()
+
+    def trim (self, maxsize = None):
+        """
+        Evicts least recently used entries until the cache holds at most
+        ``maxsize`` (default: ``self.maxsize``) entries.
+        """
+        if maxsize is None:
+            maxsize = self.maxsize
+        if maxsize is None:
+            return
+        with self._lock:
+            while len (self._data) > maxsize:
+                self._data.popitem (last = False)
+
+# >>>
+
+def freeze (value): # <<<
+    """
+    Returns a hashable version of ``value`` (lists, tuples, sets and dicts
+    are frozen recursively), to be used as (part of) a cache key.
+
+    Raises :class:`TypeError` if ``value`` contains anything unhashable that
+    cannot be frozen.
+    """
+    if isinstance (value, (list, tuple)):
+        return tuple (freeze (v) for v in value)
+    if isinstance (value, (set, frozenset)):
+        return frozenset (freeze (v) for v in value)
+    if isinstance (value, dict):
+        return tuple (sorted ((k, freeze (v)) for k, v in value.items ()))
+    hash (value)
+    return value
+# >>>
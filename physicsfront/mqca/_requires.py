@@ -3,6 +3,7 @@
 # google colab as well as terminal based ipython.
 ##
 dependencies = [
+    "numpy",
     "physicsfront-qiskit",
 ]
 extras = {
@@ -0,0 +1,274 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+Analysis of the memory of BB84 runs: key sifting, quantum bit error rate
+(QBER) and key rate.
+"""
+
+class Sift (object): # <<<
+
+    """
+    The sifted keys of a BB84 run, as computed by :func:`sift`.
+
+    Attributes:
+
+    - ``mask``:  Boolean array, one per shot (or, for circuits of several
+      ``pairs``, one per pair and shot; see :func:`bb84_columns`), true
+      where the two parties measured in the same basis.
+    - ``basis``:  ``uint8`` array of the (common) basis of the sifted bits: 0
+      for z and 1 for x.
+    - ``key1``, ``key2``:  ``uint8`` arrays of the sifted key bits of the two
+      parties.  The bits of the second party are corrected for the Bell state
+      (``kind``) of the source, so that ``key1`` and ``key2`` agree when
+      there are no errors.
+    - ``eavesdropper_key``:  ``uint8`` array of the bits the eavesdropper
+      infers for ``key1`` (or ``None`` if there is no eavesdropper).
+    - ``shots`` (number of raw bits, i.e., the length of ``mask``),
+      ``sifted`` (number of sifted bits), ``errors`` (number of sifted bits
+      where the keys disagree) and ``confidence``.
+    """
+
+    def __init__ (self, mask, basis, key1, key2, eavesdropper_key = None,
+                  confidence = 0.95):
+        self.mask = mask
+        self.basis = basis
+        self.key1 = key1
+        self.key2 = key2
+        self.eavesdropper_key = eavesdropper_key
+        self.confidence = confidence
+        self.shots = len (mask)
+        self.sifted = len (key1)
+        self.errors = int ((key1 != key2).sum ())
+
+    def __repr__ (self):
+        return (f'<Sift: {self.sifted} of {self.shots} shots sifted, '
+                f'qber = {self.qber:.4g}>')
+
+    @property
+    def eavesdropper_agreement (self):
+        """
+        The fraction of the sifted bits for which the eavesdropper's bit
+        agrees with ``key1`` (``None`` if there is no eavesdropper).
+        """
+        e = self.eavesdropper_key
+        if e is None or not self.sifted:
+            return None
+        return float ((e == self.key1).mean ())
+
+    @property
+    def eavesdropper_agreement_interval (self):
+        e = self.eavesdropper_key
+        if e is None:
+            return None
+        return wilson_interval (int ((e == self.key1).sum ()), self.sifted,
+                                self.confidence)
+
+    @property
+    def key_rate (self):
+        """
+        The asymptotic secret key rate per shot, ``sifted_fraction *
+        secret_fraction``.
+        """
+        return self.sifted_fraction * self.secret_fraction
+
+    @property
+    def qber (self):
+        """
+        The quantum bit error rate: the fraction of sifted bits where the two
+        keys disagree (``nan`` if nothing was sifted).
+        """
+        return self.errors / self.sifted if self.sifted else float ('nan')
+
+    @property
+    def qber_interval (self):
+        """
+        The Wilson score interval for ``qber`` at ``confidence``.
+        """
+        return wilson_interval (self.errors, self.sifted, self.confidence)
+
+    @property
+    def secret_fraction (self):
+        """
+        The fraction of sifted bits that remains secret after error
+        correction and privacy amplification in the asymptotic limit,
+        ``max (0, 1 - 2 h (qber))`` with the binary entropy ``h`` (Shor and
+        Preskill).
+        """
+        q = self.qber
+        if q != q: # nan
+            return 0.
+        return max (0., 1. - 2. * binary_entropy (q))
+
+    @property
+    def sifted_fraction (self):
+        return self.sifted / self.shots if self.shots else 0.
+
+# >>>
+
+def binary_entropy (p): # <<<
+    from math import log2
+    if p <= 0. or p >= 1.:
+        return 0.
+    return - p * log2 (p) - (1. - p) * log2 (1. - p)
+# >>>
+def bb84_columns (memory, dargs): # <<<
+    """
+    Returns the columns of ``memory`` (a
+    :class:`~physicsfront.mqca.memory.Memory`) of a BB84 circuit with
+    arguments ``dargs`` (see :func:`~physicsfront.mqca.qc_bb84`) as a
+    :func:`dict` of ``uint8`` arrays, with keys ``'receives1'``,
+    ``'receives2'``, ``'prep_bit1'``, ``'prep_bit2'`` (the bases: 0 for z and
+    1 for x) and, if there is an eavesdropper, ``'listens'``.
+
+    For a circuit of several ``pairs``, the arrays hold the bits of all
+    pairs, shot by shot (``shots * pairs`` bits, with pair ``p`` of shot
+    ``s`` at ``s * pairs + p``).
+    """
+    import numpy as np
+    from .analytic import bb84_parties
+    shots = memory.shots
+    basis12 = dargs.get ('basis12', 'random')
+    bases = (basis12, basis12) if isinstance (basis12, str) else basis12
+    per_pair = []
+    for party1, party2, party3 in bb84_parties (dargs):
+        ans = {}
+        for i, party, basis in ((1, party1, bases [0]),
+                                (2, party2, bases [1])):
+            ans [f'receives{i}'] = memory [party + '_receives']
+            if basis == 'random':
+                ans [f'prep_bit{i}'] = memory [party + '_prep_bit']
+            elif basis in ('z', 'x'):
+                ans [f'prep_bit{i}'] = np.full (shots, basis == 'x',
+                                                dtype = np.uint8)
+            else:
+                raise ValueError (f'Unsupported basis12: {basis12!r}')
+        if party3:
+            ans ['listens'] = memory [party3 + '_listens']
+        per_pair.append (ans)
+    if len (per_pair) == 1:
+        return per_pair [0]
+    return dict ((k, np.stack (list (c [k] for c in per_pair), axis = 1)
+                  .ravel ()) for k in per_pair [0])
+# >>>
+def qber_sprt (errors, sifted, qber0 = 0.02, qber1 = 0.25, # <<<
+               confidence = 0.99):
+    """
+    Wald's sequential probability ratio test on the QBER, for the hypotheses
+    "no eavesdropper" (the QBER is ``qber0``, as from noise alone) and
+    "eavesdropper present" (the QBER is ``qber1``; 0.25 for intercept-resend
+    in random bases), after ``errors`` errors in ``sifted`` sifted bits.
+
+    The test may be repeated as more bits are sifted (with the cumulative
+    ``errors`` and ``sifted``), and stopped as soon as it decides; each
+    wrong decision has a probability of at most ``1 - confidence``.
+
+    :returns:  A 2-tuple ``(decision, llr)``: ``'present'``, ``'absent'`` or
+        ``None`` (not decided yet, more bits are needed), and the log
+        likelihood ratio of the two hypotheses.
+    """
+    from math import log
+    if not 0. < qber0 < qber1 < 1.:
+        raise ValueError ("qber0 and qber1 must satisfy "
+                          "0 < qber0 < qber1 < 1.")
+    if not 0.5 < confidence < 1.:
+        raise ValueError (f'Invalid value {confidence!r} passed for '
+                          'confidence.')
+    llr = (errors * log (qber1 / qber0) +
+           (sifted - errors) * log ((1. - qber1) / (1. - qber0)))
+    alpha = 1. - confidence # for both kinds of error
+    if llr >= log ((1. - alpha) / alpha):
+        return 'present', llr
+    if llr <= log (alpha / (1. - alpha)):
+        return 'absent', llr
+    return None, llr
+# >>>
+def sift (memories, dargs, confidence = 0.95): # <<<
+    """
+    Sifts the keys from the memory of one or more BB84 circuits.
+
+    :param memories:  An iterable of
+        :class:`~physicsfront.mqca.memory.Memory` instances, one per circuit.
+        The shots of all circuits are concatenated (in order), so that all
+        circuits of a run are sifted as one.
+
+    :param dargs:  An iterable of the ``_dargs`` of the circuits (see
+        :func:`~physicsfront.mqca.qc_bb84`), in the same order as
+        ``memories``.
+
+    :param confidence:  The confidence level for the intervals.
+
+    :returns:  A :class:`Sift` instance.
+    """
+    import numpy as np
+    cols = []
+    kinds = []
+    for memory, d in zip (memories, dargs):
+        if not d or 'party1' not in d or 'party2' not in d:
+            raise ValueError ("Only BB84 circuits (built by qc_bb84) can be "
+                              "sifted.")
+        cols.append (bb84_columns (memory, d))
+        kinds.append (np.full (memory.shots * d.get ('pairs', 1),
+                               d.get ('kind', 1), dtype = np.uint8))
+    if not cols:
+        raise ValueError ("Nothing to sift.")
+    has_e = set ('listens' in c for c in cols)
+    if len (has_e) != 1:
+        raise ValueError ("Either all or none of the circuits must have an "
+                          "eavesdropper.")
+    def cat (key):
+        return np.concatenate (list (c [key] for c in cols))
+    kind = np.concatenate (kinds)
+    p1 = cat ('prep_bit1')
+    p2 = cat ('prep_bit2')
+    mask = p1 == p2
+    basis = p1 [mask]
+    kind = kind [mask]
+    ##
+    # Relative parity of the outcomes of the Bell state (kind) in the z and x
+    # bases; see qc_entangle_two_qubits.
+    ##
+    flip = np.where (basis, (kind == 1) | (kind == 2),
+                     (kind == 1) | (kind == 3)).astype (np.uint8)
+    key1 = cat ('receives1') [mask]
+    key2 = cat ('receives2') [mask] ^ flip
+    e = None
+    if has_e.pop ():
+        ##
+        # The eavesdropper measures the qubit of the second party in the z
+        # basis, and infers key1 accordingly.
+        ##
+        e = cat ('listens') [mask] ^ ((kind == 1) | (kind == 3)).astype (
+                np.uint8)
+    return Sift (mask, basis, key1, key2, eavesdropper_key = e,
+                 confidence = confidence)
+# >>>
+def wilson_interval (k, n, confidence = 0.95): # <<<
+    """
+    Returns the Wilson score interval ``(low, high)`` for the proportion
+    ``k / n`` at the given ``confidence`` (``(0., 1.)`` if ``n`` is 0).
+    """
+    from math import sqrt
+    from statistics import NormalDist
+    if not n:
+        return (0., 1.)
+    z = NormalDist ().inv_cdf ((1. + confidence) / 2.)
+    p = k / n
+    z2n = z * z / n
+    center = (p + z2n / 2.) / (1. + z2n)
+    half = z * sqrt (p * (1. - p) / n + z2n / (4. * n)) / (1. + z2n)
+    return (max (0., center - half), min (1., center + half))
+# >>>
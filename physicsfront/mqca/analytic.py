@@ -0,0 +1,330 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+Closed-form (analytic) simulation of the circuits built by
+:func:`~physicsfront.mqca.qc_bb84` and
+:func:`~physicsfront.mqca.qc_for_random_bits`.
+
+The outcome distributions of these circuits are known exactly, so the
+per-shot memory can be sampled directly with NumPy, without simulating any
+circuit (and without qiskit).  Use it through
+``physicsfront.mqca.experiment.run (qc, simulate = 'analytic')``.
+"""
+
+class _JobStatus (object): # <<<
+
+    """
+    A stand-in for a qiskit ``JobStatus`` member.
+    """
+
+    def __init__ (self, name, value):
+        self.name = name
+        self.value = value
+
+    def __repr__ (self):
+        return f'<JobStatus.{self.name}>'
+
+# >>>
+
+_DONE = _JobStatus ('DONE', 'job has successfully run')
+_RUNNING = _JobStatus ('RUNNING', 'job is actively running')
+_CANCELLED = _JobStatus ('CANCELLED', 'job has been cancelled')
+_ERROR = _JobStatus ('ERROR', 'job incurred error')
+
+class FutureJob (object): # <<<
+
+    """
+    A stand-in for a qiskit job that runs locally (such as in a process
+    pool), given as a :class:`concurrent.futures.Future` whose result is a
+    :class:`~physicsfront.mqca.memory.Memory` instance or a list of them.
+
+    As for :class:`LocalJob`, only the part of the job interface used by
+    :class:`~physicsfront.mqca.experiment.Run` is implemented.
+    """
+
+    def __init__ (self, future, job_id = None):
+        if job_id is None:
+            import uuid
+            job_id = 'local-' + uuid.uuid4 ().hex
+        self._future = future
+        self._job_id = job_id
+        self._result = None
+
+    def cancel (self):
+        return self._future.cancel ()
+
+    def done (self):
+        return self._future.done ()
+
+    def job_id (self):
+        return self._job_id
+
+    def result (self, timeout = None):
+        if self._result is None:
+            self._result = LocalResult (self._future.result (timeout))
+        return self._result
+
+    def status (self):
+        f = self._future
+        if not f.done ():
+            return _RUNNING
+        if f.cancelled ():
+            return _CANCELLED
+        if f.exception () is not None:
+            return _ERROR
+        return _DONE
+
+# >>>
+class LocalJob (object): # <<<
+
+    """
+    A stand-in for a qiskit job whose result is already at hand, such as the
+    result of an analytic simulation.
+
+    Only the part of the job interface used by
+    :class:`~physicsfront.mqca.experiment.Run` is implemented.
+    """
+
+    def __init__ (self, result, job_id = None):
+        if job_id is None:
+            import uuid
+            job_id = 'local-' + uuid.uuid4 ().hex
+        self._result = result
+        self._job_id = job_id
+
+    def done (self):
+        return True
+
+    def job_id (self):
+        return self._job_id
+
+    def result (self, timeout = None): # pylint: disable=W0613
+        return self._result
+
+    def status (self):
+        return _DONE
+
+# >>>
+class LocalResult (object): # <<<
+
+    """
+    A stand-in for a qiskit job result, whose memory is held as
+    :class:`~physicsfront.mqca.memory.Memory` instances, one per experiment
+    (available as ``memory_objects``).
+
+    The methods :meth:`get_memory` and :meth:`get_counts`, as well as
+    ``results [i].header.clbit_labels``, follow the qiskit conventions, so
+    that :func:`~physicsfront.qiskit.gather_counts` works on instances of this
+    class (with a single experiment).
+
+    :param memory:  A :class:`~physicsfront.mqca.memory.Memory` instance or a
+        list of them.
+    """
+
+    def __init__ (self, memory):
+        from types import SimpleNamespace
+        if not isinstance (memory, (list, tuple)):
+            memory = [memory]
+        self.memory_objects = list (memory)
+        self.results = []
+        for m in memory:
+            clbit_labels = [[name, i] for name, size in m.layout
+                            for i in range (size)]
+            header = SimpleNamespace (clbit_labels = clbit_labels,
+                                      creg_sizes = [list (t) for t
+                                                    in m.layout],
+                                      memory_slots = len (clbit_labels))
+            self.results.append (SimpleNamespace (header = header,
+                                                  shots = m.shots))
+        self.success = True
+
+    def _memory_object (self, experiment):
+        if experiment is None:
+            if len (self.memory_objects) != 1:
+                raise ValueError ("experiment must be given for a result "
+                                  "with more than one experiment.")
+            experiment = 0
+        return self.memory_objects [experiment]
+
+    def get_counts (self, experiment = None):
+        from collections import Counter
+        import numpy as np
+        from .memory import format_memory
+        memory = self._memory_object (experiment)
+        if not memory.shots:
+            return Counter ()
+        rows, counts = np.unique (memory.to_array (), axis = 0,
+                                  return_counts = True)
+        return Counter (dict (zip (format_memory (rows, memory.layout),
+                                   counts.tolist ())))
+
+    def get_memory (self, experiment = None):
+        return self._memory_object (experiment).to_strings ()
+
+# >>>
+
+def bb84_bits (shots, kind = 1, basis1 = 'random', basis2 = 'random', # <<<
+               eavesdrop = True, rng = None):
+    """
+    Samples the outcomes of ``shots`` shots of the BB84 circuit built by
+    :func:`~physicsfront.mqca.qc_bb84`.
+
+    Qubit 0 of the Bell pair (of the given ``kind``) is measured by the first
+    party and qubit 1 by the second party, each in the basis ``'z'``, ``'x'``
+    or a ``'random'`` choice between the two.  If ``eavesdrop``, qubit 1 is
+    first measured in the z basis by the third party (intercept-resend).
+
+    :returns:  A :func:`dict` of ``uint8`` arrays of length ``shots`` with
+        keys ``'receives1'``, ``'receives2'`` (the measurement outcomes),
+        ``'prep_bit1'``, ``'prep_bit2'`` (the bases: 0 for z and 1 for x) and,
+        only if ``eavesdrop``, ``'listens'``.
+    """
+    import numpy as np
+    if kind not in (0, 1, 2, 3):
+        raise ValueError (f'Invalid value {kind!r} passed for kind.')
+    if rng is None or isinstance (rng, int):
+        rng = np.random.default_rng (rng)
+    ##
+    # Relative parity of the two outcomes, when both parties measure in the
+    # same basis, for the four Bell states (see qc_entangle_two_qubits).
+    ##
+    z_anti = np.uint8 (kind in (1, 3))
+    x_anti = np.uint8 (kind in (1, 2))
+    random = iter (rng.integers (0, 2, size = (5, shots), dtype = np.uint8))
+    def basis_bits (basis):
+        if basis == 'random':
+            return next (random)
+        if basis in ('z', 'x'):
+            return np.full (shots, basis == 'x', dtype = np.uint8)
+        raise ValueError ("Invalid value for basis: not one of 'z', 'x', "
+                          "'random'")
+    p1 = basis_bits (basis1)
+    p2 = basis_bits (basis2)
+    ans = {'prep_bit1': p1, 'prep_bit2': p2}
+    if eavesdrop:
+        ##
+        # The z measurement on qubit 1 leaves the pair in a product state:
+        # qubit 1 in |e> and qubit 0 in |e ^ z_anti>.  An x measurement of
+        # either qubit then gives a uniformly random outcome.
+        ##
+        e = next (random)
+        ans ['listens'] = e
+        ans ['receives1'] = np.where (p1, next (random), e ^ z_anti)
+        ans ['receives2'] = np.where (p2, next (random), e)
+    else:
+        a = next (random)
+        flip = np.where (p1, x_anti, z_anti)
+        ans ['receives1'] = a
+        ans ['receives2'] = np.where (p1 == p2, a ^ flip, next (random))
+    for k, v in ans.items ():
+        ans [k] = v.astype (np.uint8, copy = False)
+    return ans
+# >>>
+def bb84_layout (dargs): # <<<
+    """
+    Returns the classical register layout (a tuple of ``(name, size)``) of
+    the circuit built by :func:`~physicsfront.mqca.qc_bb84` with arguments
+    ``dargs``, without building the circuit.
+    """
+    layout = []
+    basis12 = dargs.get ('basis12', 'random')
+    bases = (basis12, basis12) if isinstance (basis12, str) else basis12
+    for party1, party2, party3 in bb84_parties (dargs):
+        if party3:
+            layout.append ((party3 + '_listens', 1))
+        for party, basis in zip ((party1, party2), bases):
+            if basis == 'random':
+                layout.append ((party + '_prep_bit', 1))
+            layout.append ((party + '_receives', 1))
+    return tuple (layout)
+# >>>
+def bb84_parties (dargs): # <<<
+    """
+    Returns the list of the (register name prefixes of the) parties
+    ``(party1, party2, party3)``, one 3-tuple per pair, of the circuit built
+    by :func:`~physicsfront.mqca.qc_bb84` with arguments ``dargs``.
+    ``party3`` is ``None`` if there is no eavesdropper.
+    """
+    party1 = dargs.get ('party1', 'amar')
+    party2 = dargs.get ('party2', 'juan')
+    party3 = dargs.get ('party3', 'evil_hacker') or None
+    pairs = dargs.get ('pairs', 1)
+    if pairs == 1:
+        return [(party1, party2, party3)]
+    return list ((f'{party1}_{p}', f'{party2}_{p}',
+                  party3 and f'{party3}_{p}') for p in range (pairs))
+# >>>
+def run_analytic (qc, shots = 2000, seed = 100): # <<<
+    """
+    Samples ``shots`` shots of ``qc`` analytically and returns a
+    :class:`LocalJob`, which is done already.
+
+    ``qc`` must be a circuit built by :func:`~physicsfront.mqca.qc_bb84` or
+    by :func:`~physicsfront.mqca.qc_for_random_bits` (as recognized by its
+    ``_dargs``), or a list of such circuits, in which case the job result
+    holds one experiment per circuit, each with ``shots`` shots.
+
+    :param seed:  As in :func:`~physicsfront.qiskit.run_quantum_simulator`,
+        a fixed seed makes the run deterministic, and ``None`` means a fresh
+        seed for each run.
+    """
+    import numpy as np
+    rng = np.random.default_rng (seed)
+    if isinstance (qc, (list, tuple)):
+        return LocalJob (LocalResult (list (_sample (q, shots, rng)
+                                            for q in qc)))
+    return LocalJob (LocalResult (_sample (qc, shots, rng)))
+# >>>
+def _sample (qc, shots, rng): # <<<
+    """
+    Samples ``shots`` shots of ``qc`` with the generator ``rng`` and returns
+    the :class:`~physicsfront.mqca.memory.Memory`.
+    """
+    import numpy as np
+    from .memory import Memory, layout_of
+    dargs = getattr (qc, '_dargs', None) or {}
+    layout = layout_of (qc)
+    columns = {}
+    if 'party1' in dargs and 'party2' in dargs:
+        basis12 = dargs.get ('basis12', 'random')
+        basis1, basis2 = ((basis12, basis12) if isinstance (basis12, str)
+                          else basis12)
+        for party1, party2, party3 in bb84_parties (dargs):
+            b = bb84_bits (shots, kind = dargs.get ('kind', 1),
+                           basis1 = basis1, basis2 = basis2,
+                           eavesdrop = bool (party3), rng = rng)
+            columns [party1 + '_receives'] = b ['receives1']
+            columns [party2 + '_receives'] = b ['receives2']
+            columns [party1 + '_prep_bit'] = b ['prep_bit1'] # if random
+            columns [party2 + '_prep_bit'] = b ['prep_bit2'] # if random
+            if party3:
+                columns [party3 + '_listens'] = b ['listens']
+        for name, size in layout:
+            if size != 1 or name not in columns:
+                raise ValueError (f"Unexpected classical register {name!r} "
+                                  "in a BB84 circuit.")
+        data = np.stack (list (columns [name] for name, _ in layout))
+    elif 'measure' in dargs:
+        nbits = sum (size for _, size in layout)
+        if not nbits:
+            raise ValueError ("qc measures nothing (measure is false).")
+        data = rng.integers (0, 2, size = (nbits, shots), dtype = np.uint8)
+    else:
+        raise ValueError ("Analytic simulation supports only circuits built "
+                          "by qc_bb84 or qc_for_random_bits.")
+    return Memory (data, layout)
+# >>>
@@ -0,0 +1,173 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+Vectorized counting over :class:`~physicsfront.mqca.memory.Memory`, with the
+same semantics as :func:`~physicsfront.qiskit.gather_counts`.
+"""
+
+from ._cache import LRUCache as _LRUCache
+
+_predicate_cache = _LRUCache (maxsize = 256)
+
+class Predicate (object): # <<<
+
+    """
+    A predicate string (in the classical bit info notation of
+    :func:`~physicsfront.qiskit.expand`, e.g., ``'amar_pre| == juan_pre|'``)
+    compiled for evaluation over all shots of a memory at once.
+
+    Each classical bit in the predicate evaluates to a NumPy array of the
+    characters ``'0'`` and ``'1'`` (one per shot), so that comparisons,
+    ``&``, ``|`` and ``~`` work elementwise.  Predicates that do not
+    evaluate to a boolean array this way (e.g., those using ``and``, ``or``,
+    ``not`` or ``int (...)``) are evaluated shot by shot instead, exactly as
+    :func:`~physicsfront.qiskit.gather_counts` does.
+
+    Use :func:`compile_predicate` to get (cached) instances.
+    """
+
+    def __init__ (self, predicate):
+        from physicsfront.qiskit import expand # pylint: disable=E0401
+        assert isinstance (predicate, str)
+        self.predicate = predicate
+        self._code = compile (expand (predicate), '<predicate>', 'eval')
+        self._vectorized = None # unknown until first evaluation
+
+    def __call__ (self, memory):
+        """
+        Returns a boolean array with one value per shot of ``memory``.
+        """
+        import numpy as np
+        chars = np.array (['0', '1'])
+        columns = {}
+        def column (regname, index = None):
+            i = memory.clbit_index (regname, index)
+            if i not in columns:
+                columns [i] = chars [memory.column (i)]
+            return columns [i]
+        if self._vectorized is not False:
+            namespace = {'_': column}
+            try:
+                ans = eval (self._code, namespace, namespace) # pylint: disable=W0123
+            except (TypeError, ValueError):
+                ans = None
+            if isinstance (ans, (bool, np.bool_)):
+                self._vectorized = True
+                return np.full (memory.shots, bool (ans))
+            if (isinstance (ans, np.ndarray) and ans.dtype == np.bool_ and
+                    ans.shape == (memory.shots,)):
+                self._vectorized = True
+                return ans
+            self._vectorized = False
+        ans = np.empty (memory.shots, dtype = bool)
+        shot = 0
+        def take (regname, index = None):
+            return column (regname, index) [shot]
+        namespace = {'_': take}
+        for shot in range (memory.shots):
+            ans [shot] = eval (self._code, namespace, namespace) # pylint: disable=W0123
+        return ans
+
+# >>>
+
+def compile_predicate (predicate): # <<<
+    """
+    Returns the :class:`Predicate` for the string ``predicate`` (compiled only
+    once per string).
+    """
+    ans = _predicate_cache.get (predicate)
+    if ans is None:
+        ans = Predicate (predicate)
+        _predicate_cache.put (predicate, ans)
+    return ans
+# >>>
+def gather (memory, queries): # <<<
+    """
+    Evaluates several counting queries over ``memory`` (a
+    :class:`~physicsfront.mqca.memory.Memory`) together.
+
+    Each query is a 3-tuple ``(clbitspecs, predicate, keys)`` with the
+    meaning of the arguments of :func:`~physicsfront.qiskit.gather_counts`
+    (``clbitspecs`` being a tuple).  Each predicate and each classical bit
+    are evaluated once, however many queries share them.
+
+    :returns:  A list of :class:`~collections.Counter` instances, one per
+        query.
+    """
+    from collections import Counter
+    from collections.abc import Mapping
+    import numpy as np
+    masks = {}
+    codes = {}
+    ans = []
+    for clspecs, predicate, keys in queries:
+        clspecs = tuple (clspecs or ())
+        if predicate and predicate not in masks:
+            masks [predicate] = compile_predicate (predicate) (memory)
+        mask = masks [predicate] if predicate else None
+        if clspecs not in codes:
+            codes [clspecs] = _codes (memory, clspecs)
+        code, width, labels = codes [clspecs]
+        if mask is not None:
+            code = code [mask]
+        if width <= 20:
+            counts = np.bincount (code, minlength = 1 << width)
+            values = np.flatnonzero (counts)
+            counts = counts [values]
+        else:
+            values, counts = np.unique (code, return_counts = True)
+        c = Counter (dict (zip (labels (values), counts.tolist ())))
+        if keys:
+            if not isinstance (keys, Mapping):
+                keys = dict ((k, 0) for k in keys)
+            c.update (keys)
+        ans.append (c)
+    return ans
+# >>>
+def _codes (memory, clspecs): # <<<
+    """
+    Returns ``(code, width, labels)``: the integer code per shot of the
+    classical bits selected by ``clspecs`` (all bits, if empty), the number
+    of bits, and a function that turns an array of codes into count keys.
+    """
+    import numpy as np
+    if clspecs:
+        columns = list (memory.clbit_index (* spec) if isinstance (spec, tuple)
+                        else memory.clbit_index (spec) for spec in clspecs)
+        def labels (values):
+            return list (format (v, f'0{width}b') for v in values.tolist ())
+    else:
+        ##
+        # All classical bits: keys are whole memory strings.  Bit i of the
+        # code is classical bit i (as in qiskit hex memory).
+        ##
+        from .memory import format_memory
+        columns = list (range (memory.nbits - 1, -1, -1))
+        def labels (values):
+            values = np.asarray (values, dtype = np.uint64)
+            bits = ((values [:, None] >> np.arange (width, dtype = np.uint64))
+                    & np.uint64 (1)).astype (np.uint8)
+            return format_memory (bits, memory.layout)
+    width = len (columns)
+    if width > 63:
+        raise ValueError ("Too many classical bits to count (more than 63).")
+    code = np.zeros (memory.shots, dtype = np.int64)
+    for i in columns: # first column is the most significant (leftmost)
+        code <<= 1
+        code |= memory.column (i)
+    return code, width, labels
+# >>>
@@ -14,20 +14,251 @@
 # limitations under the License.
 ##
 
+##
+# The maximum number of shots per job on a quantum computer that does not
+# report its own (see run, max_shots = 'auto').
+##
+MAX_SHOTS_QUANTUM_COMPUTER = 100000
+
+_result_cache = None # see result_cache
+_transpile_cache = None # see transpile_cache
+_process_pools = {} # see _process_pool
+
 class Run (object): # <<<
 
-    def __init__ (self, qc, job, take_value_if_single = False):
+    """
+    The jobs of a run of circuits (see :func:`run`), and their results once
+    finalized.
+
+    The results of the circuits (``result``, ``memory``, ``bits`` and
+    ``counts``) may be finalized all at once (:meth:`finalize`), or one by
+    one as their jobs finish (:meth:`as_completed`, :meth:`wait`).  While
+    only some circuits are finalized (``is_partial``), these properties hold
+    ``None`` for the other circuits.
+
+    The shots of a circuit may be split over several jobs (see ``parts``),
+    in which case ``job`` and ``result`` hold tuples of jobs and results
+    for that circuit, while its ``memory``, ``bits`` and ``counts`` are
+    merged over all of them.
+
+    :param parts:  For each circuit, the tuple of the parts of its shots.
+        Each part is either an index into ``job`` (the job ran the circuit
+        alone) or a 3-tuple ``(index, experiment, shots)`` for a job that ran
+        several circuits as a batch: the part is experiment ``experiment`` of
+        the job, of which only the first ``shots`` shots are taken (all if
+        ``None``).  By default, the circuits and the jobs correspond one to
+        one.
+
+    :param scatter:  For each circuit, ``None`` (its parts are concatenated
+        in order) or a tuple of groups, each a 4-tuple ``(count, positions,
+        layout, fill)``, for a circuit whose shots were run by other
+        (static) circuits.  The parts of the circuit are taken ``count`` at
+        a time, in order, as the memory of a circuit with the classical
+        register ``layout``, whose shots go to ``positions`` (see
+        :meth:`~physicsfront.mqca.memory.Memory.scatter` for ``fill``).
+    """
+
+    def __init__ (self, qc, job, take_value_if_single = False, parts = None,
+                  scatter = None, tracer = None):
+        import time
         assert type (qc) is tuple
         assert type (job) is tuple
-        assert len (qc) == len (job)
+        if parts is None:
+            assert len (qc) == len (job)
+            parts = tuple ((i,) for i in range (len (qc)))
+        assert len (parts) == len (qc)
+        parts = tuple (tuple ((p, None, None) if isinstance (p, int)
+                              else tuple (p) for p in ps) for ps in parts)
+        assert (set (p [0] for ps in parts for p in ps) ==
+                set (range (len (job))))
         self._qc = qc
         self._job = job
+        self._parts = parts
+        self._scatter = (tuple (scatter) if scatter is not None
+                         else (None,) * len (qc))
+        assert len (self._scatter) == len (qc)
         self._take_value_if_single = take_value_if_single
-        self._result = self._memory = self._counts = None
+        n = len (qc)
+        self._result = [None] * n
+        self._memory = [None] * n
+        self._bits = [None] * n
+        self._counts = [None] * n
+        self._counts_cache = {}
+        self._cache_entry = None # (cache, key) to store the memory once final
+        if tracer is None:
+            from .tracing import Tracer
+            tracer = Tracer ()
+        self._tracer = tracer
+        self._created = time.time ()
+        self._traced_jobs = set () # jobs whose timings are recorded
 
     def __len__ (self):
         return len (self._qc)
 
+    def _circuit_status (self, i):
+        """
+        Returns the status name for circuit ``i``: 'DONE' if all its jobs
+        are done, and otherwise the status of a job that is not (preferring
+        'ERROR' and 'CANCELLED').
+        """
+        names = list (self._job [j].status ().name
+                      for j in self._part_jobs (i))
+        for name in ('ERROR', 'CANCELLED'):
+            if name in names:
+                return name
+        for name in names:
+            if name != 'DONE':
+                return name
+        return 'DONE'
+
+    def _finalize_circuit (self, i, keys = None, compact = False, # <<<
+                           spill = None):
+        """
+        Finalizes circuit ``i``, whose jobs must be done.
+        """
+        res = tuple (self._part_result (p) for p in self._parts [i])
+        groups = self._scatter [i]
+        b = None
+        if len (res) == 1 and groups is None:
+            res = res [0]
+        else:
+            compact = True
+        if compact or spill:
+            with self._tracer.span ('memory', circuit = i):
+                b = self._merge_bits (i, res if isinstance (res, tuple)
+                                      else (res,))
+            if spill:
+                import os
+                os.makedirs (spill, exist_ok = True)
+                b = b.spill (os.path.join (spill, f'memory-{i}.npy'))
+        self._set_final (i, res, b, keys = keys)
+    # >>>
+    def _merge_bits (self, i, parts):
+        """
+        Returns the bit-packed memory of circuit ``i`` merged from the job
+        results ``parts`` of its parts (see ``scatter``).
+        """
+        from .memory import Memory, layout_of
+        layout = layout_of (self._qc [i])
+        groups = self._scatter [i]
+        if groups is None:
+            b = Memory.concat (Memory.from_result (r, layout) for r in parts)
+        else:
+            memories = []
+            k = 0
+            for count, _, layout_g, _ in groups:
+                memories.append (Memory.concat (
+                        Memory.from_result (r, layout_g)
+                        for r in parts [k : k + count]))
+                k += count
+            b = Memory.scatter (memories, list (g [1] for g in groups), layout,
+                                list (g [3] for g in groups))
+        return b.pack ()
+
+    def _gather_counts (self, i, queries):
+        """
+        Evaluates ``queries`` (see :func:`~physicsfront.mqca.counts.gather`)
+        for circuit ``i``, using and filling the counts cache of this run.
+        """
+        from collections import Counter
+        from ._cache import freeze
+        from .counts import gather
+        cache = self._counts_cache
+        queries = list ((tuple (c or ()), p or None, k) for c, p, k in queries)
+        ckeys = list ((i, c, p, freeze (k)) for c, p, k in queries)
+        todo = list (dict ((ck, q) for ck, q in zip (ckeys, queries)
+                           if ck not in cache).items ())
+        if todo:
+            memory = self._get_bits (i)
+            with self._tracer.span ('counts', circuit = i):
+                counts = gather (memory, (q for _, q in todo))
+            for (ck, _), c in zip (todo, counts):
+                cache [ck] = c
+        return list (Counter (cache [ck]) for ck in ckeys)
+
+    def _get_bits (self, i):
+        if self._bits [i] is None and self._result [i] is not None:
+            from .memory import Memory, layout_of
+            with self._tracer.span ('memory', circuit = i):
+                self._bits [i] = Memory.from_result (self._result [i],
+                                                     layout_of (self._qc [i]))
+        return self._bits [i]
+
+    def _get_memory (self, i):
+        if self._memory [i] is None and self._result [i] is not None:
+            with self._tracer.span ('memory_strings', circuit = i):
+                if self._bits [i] is None:
+                    self._memory [i] = self._result [i].get_memory ()
+                else:
+                    self._memory [i] = self._bits [i].to_strings ()
+        return self._memory [i]
+
+    def _get_job (self, i):
+        jobs = tuple (self._job [j] for j in self._part_jobs (i))
+        return jobs [0] if len (jobs) == 1 else jobs
+
+    def _part_jobs (self, i):
+        """
+        Returns the indices of the (distinct) jobs of circuit ``i``.
+        """
+        return tuple (dict.fromkeys (p [0] for p in self._parts [i]))
+
+    def _part_result (self, part):
+        j, experiment, shots = part
+        job = self._job [j]
+        with self._tracer.span ('result', job = j):
+            res = job.result ()
+        if j not in self._traced_jobs:
+            self._traced_jobs.add (j)
+            _trace_job (self._tracer, j, job, res)
+        if experiment is None and shots is None:
+            return res
+        return _experiment_result (res, experiment, shots)
+
+    def _set_final (self, i, res, b = None, keys = None): # <<<
+        """
+        Sets the final result ``res`` (and, if given, the memory ``b``) of
+        circuit ``i``.
+        """
+        # TODO: add an option to customize this getter
+        def get_clspecs_predicate (qc):
+            dargs = getattr (qc, '_dargs', {})
+            clspecs = ()
+            predicate = None
+            if 'party1' in dargs and 'party2' in dargs:
+                ##
+                # For several pairs, the counts are those of the first pair
+                # (the pairs are alike); see sift for all pairs.
+                ##
+                from .analytic import bb84_parties
+                party1, party2, _ = bb84_parties (dargs) [0]
+                clspecs = (party1 + '_receives', party2 + '_receives')
+                if dargs.get ('basis12') == 'random':
+                    predicate = (party1 + '_prep_bit| == ' + party2 +
+                                 '_prep_bit|')
+            return clspecs, predicate
+        q = self._qc [i]
+        clspecs, predicate = get_clspecs_predicate (q)
+        for ck in list (self._counts_cache):
+            if ck [0] == i:
+                del self._counts_cache [ck]
+        self._result [i] = res
+        self._memory [i] = None
+        self._bits [i] = b
+        ##
+        # counts are functions (lambda forms), so that clspecs, predicate and
+        # keys can be retweaked later on.  They are computed over bits and
+        # cached (see gather_counts).
+        ##
+        self._counts [i] = (lambda clspecs = clspecs, predicate = predicate,
+                            keys = keys: self._gather_counts (i,
+                            [(clspecs, predicate, keys)]) [0])
+        if self._cache_entry is not None and self.is_finalized:
+            cache, key = self._cache_entry
+            self._cache_entry = None
+            cache.put (key, list (self._get_bits (j)
+                                  for j in range (len (self))))
+    # >>>
     def _get_prop_value (self, a, required = False):
         if not required and a is None:
             return
@@ -37,17 +268,39 @@ class Run (object): # <<<
             return a [0]
         return a
 
+    def _get_final_prop_value (self, getter):
+        if not any (c is not None for c in self._counts):
+            return
+        return self._get_prop_value (tuple (getter (i)
+                                            for i in range (len (self))))
+
+    @property
+    def bits (self):
+        """
+        The memory as :class:`~physicsfront.mqca.memory.Memory` instances,
+        which hold each classical bit as a NumPy column (see
+        :meth:`finalize` for the compact, bit-packed form).
+        """
+        return self._get_final_prop_value (self._get_bits)
+
     @property
     def counts (self):
-        return self._get_prop_value (self._counts)
+        return self._get_final_prop_value (self._counts.__getitem__)
 
     @property
     def job (self):
-        return self._get_prop_value (self._job, required = True)
+        return self._get_prop_value (tuple (self._get_job (i) for i
+                                            in range (len (self))),
+                                     required = True)
 
     @property
     def memory (self):
-        return self._get_prop_value (self._memory)
+        """
+        The memory as lists of strings (one per shot), in the format of qiskit
+        ``result.get_memory ()``.  They are built only when this property is
+        accessed for the first time.
+        """
+        return self._get_final_prop_value (self._get_memory)
 
     @property
     def qc (self):
@@ -55,39 +308,134 @@ class Run (object): # <<<
 
     @property
     def result (self):
-        return self._get_prop_value (self._result)
+        return self._get_final_prop_value (self._result.__getitem__)
+
+    @property
+    def timings (self):
+        """
+        The spans recorded for the phases of this run (see
+        :mod:`~physicsfront.mqca.tracing`), in the order they started, such
+        as ``'build'``, ``'submit'``, ``'transpile'``, ``'wait'``,
+        ``'queue'``, ``'execute'``, ``'result'``, ``'memory'``,
+        ``'memory_strings'`` and ``'counts'``.  See
+        :func:`~physicsfront.mqca.tracing.summarize` for the totals per
+        phase.
+        """
+        return sorted (self._tracer.spans, key = lambda s: s ['start'])
 
     @property
     def is_finalized (self):
-        r = self._result
-        m = self._memory
-        c = self._counts
-        if r is None and m is None and c is None:
-            return False
-        elif r is not None and m is not None and c is not None:
-            return True
-        else:
-            raise ValueError ("** Error: final props are partially assigned.")
+        """
+        Whether all circuits of this run are finalized.
+        """
+        return all (c is not None for c in self._counts)
+
+    @property
+    def is_partial (self):
+        """
+        Whether some, but not all, circuits of this run are finalized.
+        """
+        done = list (c is not None for c in self._counts)
+        return any (done) and not all (done)
+
+    def as_completed (self, timeout = None, interval = 1., # <<<
+                      backoff = 1.5, max_interval = 30., ** kwargs):
+        """
+        Finalizes the circuits of this run one by one as their jobs finish,
+        yielding the index of each circuit once it is finalized.
+
+        Job statuses are polled right away, and then again after each
+        sleep.  After a poll during which a job finished, the sleep is
+        ``interval`` seconds; otherwise it is the previous one (initially
+        ``interval``) multiplied by ``backoff``, but never more than
+        ``max_interval`` seconds.
+
+        Circuits finalized already are not yielded.
+
+        :param timeout:  If given, :class:`TimeoutError` is raised when
+            there are still unfinished jobs after ``timeout`` seconds.  This
+            run is then left partially finalized.
 
-    def finalize (self, keys = None, redo = False): # <<<
+        :param kwargs:  Passed to :meth:`finalize` (``keys``, ``compact``,
+            ``spill``).
+        """
+        import time
+        kwargs.pop ('redo', None)
+        kwargs.pop ('partial', None)
+        deadline = None if timeout is None else time.monotonic () + timeout
+        pending = list (i for i, c in enumerate (self._counts) if c is None)
+        delay = interval
+        while True:
+            progressed = False
+            for i in list (pending):
+                name = self._circuit_status (i)
+                if name == 'DONE':
+                    ##
+                    # From the creation of this run until the jobs of the
+                    # circuit are seen done (an upper bound of their queueing
+                    # and execution).
+                    ##
+                    self._tracer.record ('wait', self._created,
+                                         time.time () - self._created,
+                                         circuit = i)
+                    self._finalize_circuit (i, ** kwargs)
+                    pending.remove (i)
+                    progressed = True
+                    yield i
+                elif name in ('ERROR', 'CANCELLED'):
+                    # pylint: disable=W0719
+                    raise Exception ("Can't get result for a job with status "
+                                     f"= {name}.")
+            if not pending:
+                return
+            delay = interval if progressed else min (delay * backoff,
+                                                     max_interval)
+            if deadline is not None:
+                left = deadline - time.monotonic ()
+                if left <= 0:
+                    raise TimeoutError (f"{len (pending)} job(s) of this Run "
+                                        "did not finish in time.")
+                delay = min (delay, left)
+            time.sleep (delay)
+    # >>>
+    def finalize (self, keys = None, redo = False, compact = False, # <<<
+                  spill = None, partial = False):
         """
         Gets the final result for this run.
 
-        When finalized, all three properties, ``result``, ``memory``, and
-        ``counts`` will return non-``None`` values.
+        When finalized, all four properties, ``result``, ``memory``, ``bits``
+        and ``counts`` will return non-``None`` values.
+
+        :param keys:  The default ``keys`` of ``counts`` (see
+            :meth:`gather_counts`).
+
+        :param compact:  If true, the memory is extracted right away into
+            bit-packed :class:`~physicsfront.mqca.memory.Memory` instances
+            (one bit per classical bit and shot), which ``bits`` returns.  The
+            ``memory`` strings are then built from them, and only if
+            requested.
 
-        :param keys:  Passed to :func:`~physicsfront.qiskit.gather_counts`
-            when collecting counts after collecting run results.
+        :param spill:  If given, it must be a directory path, where the
+            bit-packed memory of each circuit is written to a ``.npy`` file
+            (``memory-<index>.npy``) and then used memory-mapped.  This
+            implies ``compact``.
+
+        :param partial:  If true, only the circuits whose jobs are done are
+            finalized (and the others are left alone), instead of raising an
+            exception if not all jobs are done.
         """
-        from physicsfront.qiskit import gather_counts # pylint: disable=E0401
         import sys
-        jobs = self._job
-        for job in jobs:
-            status = job.status ()
-            if status.name != 'DONE':
+        todo = []
+        for i in range (len (self)):
+            if self._counts [i] is not None and not redo:
+                continue
+            name = self._circuit_status (i)
+            if name == 'DONE':
+                todo.append (i)
+            elif not partial:
                 # pylint: disable=W0719
                 raise Exception ("Can't get result for a job with status = "
-                                 f"{status.name}.")
+                                 f"{name}.")
         if self.is_finalized and not redo:
             print ("""This Run object has already been finalized.
 There is nothing to do.
@@ -95,33 +443,44 @@ There is nothing to do.
 To re-finalize, you can pass a true value for the 'redo' argument.""",
                    file = sys.stderr)
             return
-        # TODO: add an option to customize this getter
-        def get_clspecs_predicate (qc):
-            dargs = getattr (qc, '_dargs', {})
-            clspecs = ()
-            predicate = None
-            if 'party1' in dargs and 'party2' in dargs:
-                clspecs = (dargs ['party1'] + '_rec', dargs ['party2'] +
-                           '_rec')
-                if dargs.get ('basis12') == 'random':
-                    predicate = (dargs ['party1'] + '_pre| == ' +
-                                 dargs ['party2'] + '_pre|')
-            return clspecs, predicate
-        qc = self._qc
-        r = tuple (job.result () for job in jobs)
-        m = tuple (res.get_memory () for res in r)
-        cp = tuple (get_clspecs_predicate (q) for q in qc)
-        ##
-        # counts are functions (lambda forms); maybe keys can be retweaked
-        # later on?
-        ##
-        counts = tuple ((lambda clspecs = c_p [0], predicate = c_p [1],
-                         keys = keys, res = res: gather_counts (res, * clspecs,
-                         predicate = predicate, keys = keys))
-                        for c_p, res in zip (cp, r))
-        self._result = r
-        self._memory = m
-        self._counts = counts
+        if redo:
+            self._counts_cache = {}
+        for i in todo:
+            self._finalize_circuit (i, keys = keys, compact = compact,
+                                    spill = spill)
+    # >>>
+    def gather_counts (self, queries): # <<<
+        """
+        Gathers counts for several queries at once, per circuit.
+
+        Each query is a 3-tuple ``(clspecs, predicate, keys)`` or a
+        :func:`dict` with (some of) these keys, with the same meaning as the
+        arguments of :func:`~physicsfront.qiskit.gather_counts`: ``clspecs``
+        is a tuple of classical bit specifications, ``predicate`` a string in
+        the classical bit info notation and ``keys`` the keys to make sure
+        to exist.
+
+        The predicates are compiled once into vectorized evaluators (see
+        :class:`~physicsfront.mqca.counts.Predicate`), and all queries are
+        evaluated in a single pass over the memory of each circuit.  The
+        results (as well as those of ``counts``) are cached in this run until
+        it is finalized again.
+
+        :returns:  A list of :class:`~collections.Counter` instances, one per
+            query, for each circuit (or just one list, if this run is for a
+            single circuit).  If this run is only partially finalized, the
+            list is ``None`` for the circuits that are not finalized yet.
+        """
+        if not any (c is not None for c in self._counts):
+            raise ValueError ("This Run has not been finalized yet.")
+        qs = []
+        for q in queries:
+            if isinstance (q, dict):
+                q = (q.get ('clspecs'), q.get ('predicate'), q.get ('keys'))
+            qs.append (tuple (q))
+        return self._get_final_prop_value (lambda i: None if self._counts [i]
+                                           is None else
+                                           self._gather_counts (i, qs))
     # >>>
     def monitor (self): # <<<
         import sys
@@ -132,83 +491,1227 @@ To re-finalize, you can pass a true value for the 'redo' argument.""",
         from physicsfront.qiskit import jobs_monitor # pylint: disable=E0401
         return jobs_monitor (self._job)
     # >>>
+    def save (self, path): # <<<
+        """
+        Saves this run to the file ``path`` (in the NumPy ``.npz`` format),
+        so that :meth:`load` can get it back in another process: the
+        circuits (as QPY), their ``_dargs``, the job IDs and the shot
+        allocation over the jobs, and the bit-packed memory of the finalized
+        circuits.
+
+        The circuits that are not finalized yet must be run by remote jobs
+        (on a quantum computer), which a loaded run reattaches to.  Local
+        jobs (simulator, analytic or process pool ones) cannot be
+        reattached, so those circuits must be finalized first.
+        """
+        import io, json
+        import numpy as np
+        from qiskit import qpy
+        local = list (_is_local_job (job) for job in self._job)
+        final = list (c is not None for c in self._counts)
+        for i in range (len (self)):
+            if not final [i] and any (local [j] for j in self._part_jobs (i)):
+                raise ValueError (f"Circuit {i} of this Run is not finalized "
+                                  "and its jobs are local: finalize it "
+                                  "before saving.")
+        arrays = {}
+        saved_bits = []
+        for i in range (len (self)):
+            if final [i]:
+                b = self._get_bits (i).pack ()
+                arrays [f'bits{i}'] = b._data
+                saved_bits.append ([list (map (list, b.layout)), b.shots])
+            else:
+                saved_bits.append (None)
+        scatter = []
+        for i, groups in enumerate (self._scatter):
+            if groups is None:
+                scatter.append (None)
+                continue
+            scatter.append (list ([count, list (map (list, layout)), fill]
+                                  for count, _, layout, fill in groups))
+            for g, (_, positions, _, _) in enumerate (groups):
+                arrays [f'scatter_{i}_{g}'] = np.asarray (positions)
+        meta = {
+            'version': 1,
+            'take_value_if_single': self._take_value_if_single,
+            'jobs': list ([job.job_id (), loc] for job, loc
+                          in zip (self._job, local)),
+            'parts': list (list (map (list, ps)) for ps in self._parts),
+            'scatter': scatter,
+            'dargs': list (getattr (q, '_dargs', None) for q in self._qc),
+            'bits': saved_bits,
+        }
+        f = io.BytesIO ()
+        qpy.dump (list (self._qc), f)
+        arrays ['qpy'] = np.frombuffer (f.getvalue (), dtype = np.uint8)
+        arrays ['meta'] = np.array (json.dumps (meta))
+        with open (path, 'wb') as f:
+            np.savez (f, ** arrays)
+    # >>>
+    def sift (self, confidence = 0.95): # <<<
+        """
+        Sifts the keys of this (finalized) BB84 run.
+
+        All circuits of this run are sifted together, so that the z and x
+        circuits that :func:`bb84` runs on a quantum computer give one set of
+        keys.  If this run is only partially finalized, just the finalized
+        circuits are sifted.
+
+        :returns:  A :class:`~physicsfront.mqca.analysis.Sift` instance with
+            the sifted keys of both parties, the matching-basis mask, QBER
+            (with its confidence interval), the eavesdropper's agreement rate
+            and the key rate.
+        """
+        from .analysis import sift
+        done = list (i for i, c in enumerate (self._counts) if c is not None)
+        if not done:
+            raise ValueError ("This Run has not been finalized yet.")
+        return sift (list (self._get_bits (i) for i in done),
+                     list (getattr (self._qc [i], '_dargs', None)
+                           for i in done),
+                     confidence = confidence)
+    # >>>
+    def wait (self, timeout = None, interval = 1., backoff = 1.5, # <<<
+              max_interval = 30., ** kwargs):
+        """
+        Waits for all jobs of this run to finish, finalizing each circuit as
+        soon as its job is done (see :meth:`as_completed` for the
+        arguments), and returns this run.
+        """
+        for _ in self.as_completed (timeout = timeout, interval = interval,
+                                    backoff = backoff,
+                                    max_interval = max_interval, ** kwargs):
+            pass
+        return self
+    # >>>
+    # <<< def concat (cls, runs):
+    @classmethod
+    def concat (cls, runs):
+        """
+        Returns a run of the shots of ``runs`` (of the same circuits, such
+        as the rounds of :func:`bb84_adaptive`), in order.  Its jobs are
+        those of all ``runs``, and its circuits are finalized already if
+        they are finalized in all ``runs``.
+        """
+        from .memory import Memory
+        from .tracing import Tracer
+        runs = list (runs)
+        if not runs:
+            raise ValueError ("Nothing to concatenate.")
+        n = len (runs [0])
+        if any (len (r) != n for r in runs):
+            raise ValueError ("Runs of different circuits can't be "
+                              "concatenated.")
+        scattered = set (r._scatter [i] is not None for r in runs
+                         for i in range (n))
+        if len (scattered) != 1:
+            raise ValueError ("Runs with and without scattered shots can't "
+                              "be concatenated.")
+        jobs = []
+        parts = list ([] for _ in range (n))
+        scatter = list ([] for _ in range (n)) if scattered.pop () else None
+        for r in runs:
+            for i in range (n):
+                parts [i].extend ((j + len (jobs), e, k)
+                                  for j, e, k in r._parts [i])
+                if scatter is not None:
+                    ##
+                    # The shots of each run go after those of the previous
+                    # runs.
+                    ##
+                    offset = sum (len (g [1]) for g in scatter [i])
+                    scatter [i].extend ((count, positions + offset, layout,
+                                         fill) for count, positions, layout,
+                                        fill in r._scatter [i])
+            jobs.extend (r._job)
+        if scatter is not None:
+            scatter = tuple (tuple (g) for g in scatter)
+        tracer = Tracer ()
+        tracer.spans = list (s for r in runs for s in r._tracer.spans)
+        ans = cls (runs [0]._qc, tuple (jobs),
+                   take_value_if_single = runs [0]._take_value_if_single,
+                   parts = tuple (tuple (p) for p in parts),
+                   scatter = scatter, tracer = tracer)
+        for i in range (n):
+            if all (r._counts [i] is not None for r in runs):
+                res = tuple (x for r in runs for x
+                             in (r._result [i]
+                                 if isinstance (r._result [i], tuple)
+                                 else (r._result [i],)))
+                ans._set_final (i, res, Memory.concat (r._get_bits (i)
+                                                       for r in runs))
+        return ans
+    # >>>
+    # <<< def load (cls, path, provider = None):
+    @classmethod
+    def load (cls, path, provider = None):
+        """
+        Loads a run saved by :meth:`save`.  The remote jobs of its circuits
+        that are not finalized are reattached (retrieved by their IDs, see
+        :func:`~physicsfront.qiskit.get_provider` for ``provider``), so that
+        it can be waited for and finalized without running anything again.
+        Its finalized circuits are finalized already, from the saved memory
+        (no provider is needed if all of them are).
+        """
+        import io, json
+        import numpy as np
+        from qiskit import qpy
+        from physicsfront.qiskit import get_provider # pylint: disable=E0401
+        from .analytic import LocalJob, LocalResult
+        from .memory import Memory
+        with np.load (path) as f:
+            meta = json.loads (str (f ['meta']))
+            if meta.get ('version') != 1:
+                raise ValueError (f"Unsupported Run file: {path!r}.")
+            qc = tuple (qpy.load (io.BytesIO (f ['qpy'].tobytes ())))
+            bits = list (None if b is None else
+                         Memory (f [f'bits{i}'],
+                                 tuple (map (tuple, b [0])), packed = True,
+                                 shots = b [1])
+                         for i, b in enumerate (meta ['bits']))
+            positions = dict ((k, f [k]) for k in f.files
+                              if k.startswith ('scatter_'))
+        for q, dargs in zip (qc, meta ['dargs']):
+            if dargs is not None:
+                ##
+                # JSON turns tuples (such as a basis12 of two bases) into
+                # lists.
+                ##
+                q._dargs = dict ((k, tuple (v) if isinstance (v, list)
+                                  else v) for k, v in dargs.items ())
+        ##
+        # Only the remote jobs of the circuits that are not finalized are
+        # reattached.
+        ##
+        needed = sorted (set (p [0] for b, ps in zip (bits, meta ['parts'])
+                              if b is None for p in ps))
+        jobs = []
+        index = {} # saved job index -> index in jobs
+        if needed:
+            prov = get_provider (provider = provider)
+        for j in needed:
+            index [j] = len (jobs)
+            jobs.append (prov.retrieve_job (meta ['jobs'] [j] [0]))
+        parts = []
+        scatter = []
+        for i, ps in enumerate (meta ['parts']):
+            if bits [i] is not None:
+                ##
+                # The finalized circuit gets a job of its own holding its
+                # saved memory (its local jobs, if any, are gone).
+                ##
+                parts.append (((len (jobs), None, None),))
+                scatter.append (None)
+                jobs.append (LocalJob (LocalResult (bits [i])))
+                continue
+            parts.append (tuple ((index [j], e, n) for j, e, n in ps))
+            groups = meta ['scatter'] [i]
+            scatter.append (None if groups is None else
+                            tuple ((count, positions [f'scatter_{i}_{g}'],
+                                    tuple (map (tuple, layout)), fill)
+                                   for g, (count, layout, fill)
+                                   in enumerate (groups)))
+        ans = cls (qc, tuple (jobs),
+                   take_value_if_single = meta ['take_value_if_single'],
+                   parts = tuple (parts), scatter = tuple (scatter))
+        for i, b in enumerate (bits):
+            if b is not None:
+                ans._set_final (i, LocalResult (b), b)
+        return ans
+    # >>>
 
 # >>>
 
+def _allocation (qc, shots, seed): # <<<
+    """
+    Returns ``(qc, as_tuple, allocation)`` for :func:`run`: the tuple of
+    circuits, whether ``qc`` was given as a tuple/list, and the shots of
+    each circuit.
+    """
+    import numpy as np
+    as_tuple = isinstance (qc, (tuple, list))
+    if as_tuple and isinstance (shots, (tuple, list)):
+        qc = tuple (qc)
+        if len (shots) != len (qc):
+            raise ValueError ("shots must be given for each circuit.")
+        return qc, as_tuple, list (int (n) for n in shots)
+    if as_tuple:
+        qc = tuple (qc)
+        N = len (qc)
+        assert N >= 1
+        ##
+        # Each shot goes to a circuit chosen uniformly at random; drawn at
+        # once (and reproducibly for a given seed) as a multinomial split.
+        ##
+        return qc, as_tuple, np.random.default_rng (seed).multinomial (
+                shots, [1. / N] * N).tolist ()
+    return (qc,), as_tuple, [shots]
+# >>>
 def bb84 (source_name = 'secret_quantume_key', # <<< pylint: disable=W0613
           party1 = 'amar', party2 = 'juan', # pylint: disable=W0613
           party3 = 'evil_hacker', basis12 = 'random', # pylint: disable=W0613
-          barrier = 'auto', simulate = True,
-          shots = 10000, seed = 100): # pylint: disable=W0613
+          barrier = 'auto', simulate = True, # pylint: disable=W0613
+          shots = 10000, seed = 100, kind = 1, # pylint: disable=W0613
+          basis_choice = 'auto', pairs = 1, # pylint: disable=W0613
+          prep = 'initialize', ** kwargs): # pylint: disable=W0613
     """
     Sets up a BB84 experiment, runs it using :func:`run`, and returns the
     result.
 
     This function is a simple wrapper around
-    :func:`~physicsfront.mqca.qc_bb84` and :func:`run`.  All arguments from
-    ``simulate`` and after are passed to :func:`run`, while all other
+    :func:`~physicsfront.mqca.qc_bb84` and :func:`run`.  The arguments
+    ``simulate``, ``shots`` and ``seed`` (and any other keyword arguments,
+    such as ``concurrent``) are passed to :func:`run`, while all other
     arguments are used for :func:`~physicsfront.mqca.qc_bb84`.
 
-    The two arguments that are processed by this function, instead of merely
-    being passed through, are ``basis12`` and ``barrier``.
+    The arguments that are processed by this function, instead of merely
+    being passed through, are ``basis12``, ``barrier`` and ``basis_choice``.
 
-    :param basis:  If 'random' (default) and ``simulate`` is false, then
-        this function will create two quantum circuits, not one, due to the
-        fact that qasm3/dynamic-circuit does not work with qiskit (as of Jan
-        2023, at least).
+    :param basis_choice:  How the bases are chosen at random when
+        ``basis12`` is 'random' (default): with ``'quantum'``, by the circuit
+        itself (an extra qubit per party and a dynamic circuit, see
+        :func:`~physicsfront.mqca.qc_measure_qubit`).  With ``'classical'``,
+        the bases of all shots are drawn up front (from ``seed``), and the
+        shots are run, grouped by bases, with the four static circuits of
+        ``basis12`` z/x by z/x, which need neither the extra qubits nor a
+        dynamic circuit (qasm3/dynamic-circuit does not work with qiskit on
+        quantum computers, as of Jan 2023, at least).  Either way, the
+        returned :class:`Run` is for the 'random' circuit: its memory holds
+        the shots in the order drawn, with the same classical registers.
+
+        By default (``'auto'``), the choice is classical if ``simulate`` is
+        false, and quantum otherwise.  Only one pair is supported with the
+        classical choice, so that ``pairs`` above 1 on a quantum computer
+        (with ``basis12`` 'random') raises :class:`ValueError`, unless
+        ``'quantum'`` is passed explicitly.
 
     :param barrier:  By default, this argument is set to true if ``simulate``
         and false otherwise.  Using barriers while not simulating will
         result in unexpected/wrong results.  So, the default value 'auto'
         must not be modified without a really good reason to do so.
+
+    :param simulate:  See :func:`run`.  With ``'analytic'``, the outcomes are
+        sampled from their known distributions, which is much faster than
+        simulating the circuit.
+
+    :param prep:  See :func:`~physicsfront.mqca.qc_bb84`.  With ``'gates'``,
+        the circuit has no ``initialize`` (and so no reset), which the Aer
+        simulator runs much faster.
     """
     dargs1 = dict (** locals ())
+    dargs2 = dargs1.pop ('kwargs')
+    basis_choice = dargs1.pop ('basis_choice')
+    if basis_choice == 'auto':
+        basis_choice = 'quantum' if simulate else 'classical'
+        if pairs != 1 and basis_choice == 'classical' and basis12 == 'random':
+            ##
+            # The quantum choice needs dynamic circuits, which do not work on
+            # quantum computers; so, it is not made silently.
+            ##
+            raise ValueError ("basis_choice 'classical' supports only one "
+                              "pair: pass pairs = 1, a static basis12, or "
+                              "basis_choice = 'quantum' (dynamic circuits) "
+                              "explicitly.")
+    if basis_choice not in ('quantum', 'classical'):
+        raise ValueError (f'Invalid value {basis_choice!r} passed for '
+                          'basis_choice.')
     if barrier == 'auto':
         dargs1 ['barrier'] = barrier = bool (simulate)
     if not simulate and barrier:
         import sys
         print ("** WARNING: barrier is set for quantum computer run---this "
                "can easily produce an unexpected result.", file = sys.stderr)
-    dargs2 = dict ((k, dargs1.pop (k)) for k
+    dargs2.update ((k, dargs1.pop (k)) for k
                    in ('simulate', 'shots', 'seed'))
     from physicsfront.mqca import qc_bb84 # pylint: disable=E0401,E0611
-    if not simulate and basis12 == 'random':
-        # workaround (since qasm3 (dynamic circuit) does not work yet)
-        del dargs1 ['basis12']
-        dargs2 ['shots'] = int (dargs2 ['shots'] / 2)
-        qc = (qc_bb84 (basis12 = 'z', ** dargs1),
-              qc_bb84 (basis12 = 'x', ** dargs1))
+    if basis_choice == 'classical' and basis12 == 'random':
+        return _bb84_classical_bases (dargs1, dargs2)
+    import time
+    start = time.time ()
+    t0 = time.perf_counter ()
+    qc = qc_bb84 (** dargs1)
+    duration = time.perf_counter () - t0
+    ans = run (qc, ** dargs2)
+    ##
+    # With noise_models, a list of runs (which share their tracer).
+    ##
+    (ans [0] if isinstance (ans, list) else ans)._tracer.record (
+            'build', start, duration)
+    return ans
+# >>>
+def bb84_adaptive (shots = 10000, initial_shots = 200, growth = 2., # <<<
+                   confidence = 0.99, qber0 = 0.02, qber1 = 0.25,
+                   seed = 100, ** kwargs):
+    """
+    Runs the BB84 experiment (see :func:`bb84`) in rounds of growing shots,
+    until it is decided, with a sequential test on the QBER of the sifted
+    keys (see :func:`~physicsfront.mqca.analysis.qber_sprt`), whether an
+    eavesdropper is present, or until ``shots`` shots in total are used.
+    An eavesdropper pushes the QBER far above that of noise alone, so that
+    a few hundred shots may do instead of the full ``shots``.
+
+    Each round is waited for (see :meth:`Run.wait`) before the next one is
+    submitted.
+
+    :param initial_shots:  The shots of the first round; each next round
+        has ``growth`` times as many (but no more than what is left of
+        ``shots``).
+
+    :param confidence, qber0, qber1:  See
+        :func:`~physicsfront.mqca.analysis.qber_sprt`.
+
+    :param seed:  The seed of the first round; the other rounds get seeds
+        derived from it.
+
+    :param kwargs:  Passed to :func:`bb84` (e.g., ``party3``, ``simulate``
+        and ``kind``).
+
+    :returns:  A 3-tuple ``(decision, shots_used, run)``: ``'present'``,
+        ``'absent'`` or ``None`` (if the shots ran out before a decision),
+        the number of shots used, and the :class:`Run` of all rounds (see
+        :meth:`Run.concat`), which is finalized.
+    """
+    import numpy as np
+    from .analysis import qber_sprt
+    if initial_shots < 1 or growth < 1.:
+        raise ValueError ("initial_shots must be positive and growth at "
+                          "least 1.")
+    runs = []
+    used = errors = sifted = 0
+    decision = None
+    n = initial_shots
+    while decision is None and used < shots:
+        m = min (int (n), shots - used)
+        s = seed
+        if seed is not None and runs:
+            s = int (np.random.SeedSequence ([seed, len (runs)])
+                     .generate_state (1) [0])
+        r = bb84 (shots = m, seed = s, ** kwargs).wait ()
+        runs.append (r)
+        used += m
+        keys = r.sift ()
+        errors += keys.errors
+        sifted += keys.sifted
+        decision, _ = qber_sprt (errors, sifted, qber0 = qber0,
+                                 qber1 = qber1, confidence = confidence)
+        n *= growth
+    return decision, used, Run.concat (runs)
+# >>>
+def _bb84_classical_bases (dargs_qc, dargs_run): # <<<
+    """
+    Runs the BB84 experiment with the bases drawn classically (see
+    :func:`bb84`), and returns the :class:`Run` for the 'random' circuit.
+    """
+    import time
+    import numpy as np
+    from physicsfront.mqca import qc_bb84 # pylint: disable=E0401,E0611
+    from .memory import layout_of
+    start = time.time ()
+    t0 = time.perf_counter ()
+    if dargs_qc.get ('pairs', 1) != 1:
+        raise ValueError ("basis_choice 'classical' supports only one pair.")
+    dargs_qc = dict (dargs_qc)
+    del dargs_qc ['basis12']
+    dargs_run = dict (dargs_run)
+    shots = dargs_run.pop ('shots')
+    cache = dargs_run.pop ('cache', False)
+    party1 = dargs_qc ['party1']
+    party2 = dargs_qc ['party2']
+    qc = qc_bb84 (basis12 = 'random', ** dargs_qc)
+    ##
+    # The run is cached as a run of the 'random' circuit (apart from the runs
+    # with the quantum basis choice), since the static circuits actually run
+    # depend on the bases drawn.
+    ##
+    _check_noise_models (dargs_run.get ('noise_models'),
+                         dargs_run ['simulate'], dargs_run.get ('workers'),
+                         cache)
+    hit, entry = _cached_run (qc, dargs_run ['simulate'], shots,
+                              dargs_run ['seed'],
+                              dargs_run.get ('max_shots', 'auto'),
+                              dargs_run.get ('batch', False),
+                              dargs_run.get ('workers'), cache,
+                              basis_choice = 'classical')
+    if hit is not None:
+        hit._tracer.record ('build', start, time.perf_counter () - t0)
+        return hit
+    ##
+    # Bases of the two parties per shot (0 for z and 1 for x), as the
+    # 'random' circuit would draw them.
+    ##
+    choice = np.random.default_rng (dargs_run ['seed']).integers (
+            0, 2, size = (2, shots), dtype = np.uint8)
+    group = 2 * choice [0] + choice [1]
+    variants = []
+    groups = []
+    for g, bases in enumerate ((('z', 'z'), ('z', 'x'), ('x', 'z'),
+                                ('x', 'x'))):
+        positions = np.flatnonzero (group == g)
+        if not len (positions):
+            continue
+        q = qc_bb84 (basis12 = bases, ** dargs_qc)
+        variants.append (q)
+        groups.append ([positions, layout_of (q),
+                        {party1 + '_prep_bit': int (bases [0] == 'x'),
+                         party2 + '_prep_bit': int (bases [1] == 'x')}])
+    duration = time.perf_counter () - t0
+    ans = run (variants, shots = list (len (g [0]) for g in groups),
+               ** dargs_run)
+    def random_run (r):
+        scatter = tuple ((len (p),) + tuple (g) for p, g in zip (r._parts,
+                                                               groups))
+        return Run ((qc,), r._job, take_value_if_single = True,
+                    parts = (sum (r._parts, ()),), scatter = (scatter,),
+                    tracer = r._tracer)
+    if isinstance (ans, list): # noise_models
+        ans [0]._tracer.record ('build', start, duration)
+        return list (random_run (r) for r in ans)
+    ans._tracer.record ('build', start, duration)
+    ans = random_run (ans)
+    ans._cache_entry = entry
+    return ans
+# >>>
+def _cached_run (qc, simulate, shots, seed, max_shots, batch, # <<<
+                 workers, cache, ** kwargs):
+    """
+    Looks ``qc`` up in the result cache for :func:`run` and
+    :func:`run_async` (and :func:`bb84`, which passes the basis choice in
+    ``kwargs``, other arguments that determine the run, for the key).
+
+    :returns:  A 2-tuple ``(run, entry)``: the finalized :class:`Run` on a
+        cache hit (and otherwise ``None``), and the ``(cache, key)`` under
+        which the memory of the run is to be stored on a cache miss (or
+        ``None``, if the run is not to be cached).
+    """
+    if not cache or not simulate or seed is None:
+        return None, None
+    from .resultcache import ResultCache, run_key
+    if not isinstance (cache, ResultCache):
+        result_cache ()
+        cache = _result_cache
+    as_tuple = isinstance (qc, (tuple, list))
+    qc = tuple (qc) if as_tuple else (qc,)
+    if simulate == 'analytic':
+        backend = 'analytic'
     else:
-        qc = qc_bb84 (** dargs1)
-    return run (qc, ** dargs2)
+        import qiskit_aer # pylint: disable=E0401
+        backend = 'aer_simulator ' + qiskit_aer.__version__
+    if max_shots == 'auto':
+        max_shots = None
+    key = run_key (qc, shots = shots, seed = seed, backend = backend,
+                   max_shots = max_shots, batch = bool (batch),
+                   workers = workers, ** kwargs)
+    from .tracing import Tracer
+    tracer = Tracer ()
+    with tracer.span ('cache'):
+        memories = cache.get (key)
+    if memories is None or len (memories) != len (qc):
+        return None, (cache, key)
+    from .analytic import LocalJob, LocalResult
+    ans = Run (qc, tuple (LocalJob (LocalResult (m)) for m in memories),
+               take_value_if_single = not as_tuple, tracer = tracer)
+    ans.finalize ()
+    return ans, None
+# >>>
+def _check_noise_models (noise_models, simulate, workers, cache): # <<<
+    """
+    Checks that ``noise_models`` go with the other arguments of :func:`run`.
+    """
+    if noise_models is None:
+        return
+    if not simulate or simulate == 'analytic':
+        raise ValueError ("noise_models requires simulate = True (Aer).")
+    if workers or cache:
+        raise ValueError ("noise_models can't be combined with workers or "
+                          "cache.")
+# >>>
+def _experiment_result (res, experiment, shots = None): # <<<
+    """
+    Returns a job result holding only experiment ``experiment`` of the job
+    result ``res`` (of a batch of circuits), and only its first ``shots``
+    shots (all if ``None``).
+    """
+    memories = getattr (res, 'memory_objects', None)
+    if memories is not None: # LocalResult
+        from .analytic import LocalResult
+        m = memories [experiment or 0]
+        if shots is not None and shots < m.shots:
+            m = m.select (slice (0, shots))
+        return LocalResult (m)
+    import copy
+    from collections import Counter
+    er = res.results [experiment or 0]
+    if shots is not None and shots < er.shots:
+        er = copy.copy (er)
+        er.data = data = copy.copy (er.data)
+        data.memory = data.memory [: shots]
+        data.counts = dict (Counter (data.memory))
+        er.shots = shots
+    ans = copy.copy (res)
+    ans.results = [er]
+    return ans
+# >>>
+def _is_local_job (job): # <<<
+    """
+    Whether ``job`` runs (or ran) locally, so that it cannot be retrieved by
+    its ID later on (see :meth:`Run.save`).
+    """
+    from .analytic import FutureJob, LocalJob
+    if isinstance (job, (FutureJob, LocalJob)):
+        return True
+    module = type (job).__module__
+    return module.startswith (('qiskit_aer.', 'qiskit.providers.aer.',
+                               'qiskit.providers.basicaer.'))
+# >>>
+def _max_shots (backend): # <<<
+    """
+    Returns the maximum number of shots per job of ``backend`` (a quantum
+    computer), as it reports it, or ``MAX_SHOTS_QUANTUM_COMPUTER``.
+    """
+    max_shots = None
+    configuration = getattr (backend, 'configuration', None)
+    if callable (configuration):
+        max_shots = getattr (configuration (), 'max_shots', None)
+    return max_shots or MAX_SHOTS_QUANTUM_COMPUTER
 # >>>
-def run (qc, simulate = True, shots = 10000, seed = 100): # <<<
+def _noise_model_runs (qc, jobs, as_tuple, parts, tracer): # <<<
+    """
+    Returns the list of the runs, one per noise model, of the (shared)
+    ``jobs`` of :func:`run` with ``noise_models``.
+    """
+    ans = list (Run (qc, jobs, take_value_if_single = not as_tuple,
+                     parts = p, tracer = tracer) for p in parts)
+    for r in ans [1:]:
+        r._traced_jobs = ans [0]._traced_jobs # jobs recorded once
+    return ans
+# >>>
+def _noisy_circuits (qc, noise_models, tracer = None): # <<<
+    """
+    Returns the list of the circuits ``qc`` (a tuple) with the errors of
+    each of ``noise_models`` inserted (see :func:`run`), noise model by
+    noise model.  The circuits are transpiled once per set of basis gates
+    of the noise models (without optimization, which could merge away the
+    gates the errors are attached to).
+    """
+    # pylint: disable=E0401,E0611
+    from qiskit import transpile
+    from qiskit_aer.utils import insert_noise
+    # pylint: enable=E0401,E0611
+    noise_models = list (noise_models)
+    if not noise_models:
+        raise ValueError ("noise_models must not be empty.")
+    for nm in noise_models:
+        if 'measure' in nm.noise_instructions:
+            raise ValueError ("Readout (and measure) errors are not "
+                              "supported in noise_models.")
+    def noisy ():
+        transpiled = {}
+        ans = []
+        for nm in noise_models:
+            basis = tuple (sorted (nm.basis_gates))
+            if basis not in transpiled:
+                transpiled [basis] = transpile (list (qc),
+                                                basis_gates = list (basis),
+                                                optimization_level = 0)
+            ans.extend (insert_noise (transpiled [basis], nm))
+        return ans
+    if tracer is None:
+        return noisy ()
+    with tracer.span ('transpile'):
+        return noisy ()
+# >>>
+def _process_pool (workers): # <<<
+    """
+    Returns the process pool of ``workers`` processes for :func:`run`
+    (created once, and then reused by all runs).
+    """
+    pool = _process_pools.get (workers)
+    if pool is None:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = _process_pools [workers] = ProcessPoolExecutor (
+                max_workers = workers, mp_context = _process_context ())
+    return pool
+# >>>
+def _process_context (): # <<<
+    """
+    Returns the multiprocessing context for the process pools of this
+    module.  Workers are spawned, not forked: forked workers hang in Aer once
+    the parent process has run an Aer simulation.
+    """
+    import multiprocessing
+    return multiprocessing.get_context ('spawn')
+# >>>
+def _quantum_computer (qc): # <<<
+    """
+    Returns the backend on which :func:`run` runs the circuits ``qc`` (a
+    tuple) on a quantum computer: the least busy of the operational ones
+    with enough qubits.  All jobs of a run go to this backend.
+    """
+    from physicsfront.qiskit import backends # pylint: disable=E0401,E0611
+    n = max (q.num_qubits for q in qc)
+    bs = list (backends (filters = lambda x:
+                         x.configuration ().n_qubits >= n and
+                         not x.configuration ().simulator and
+                         x.status ().operational == True))
+    if not len (bs):
+        raise ValueError ("No suitable backends found.")
+    if len (bs) > 1:
+        from qiskit_ibm_provider import least_busy # pylint: disable=E0401
+        b = least_busy (bs)
+        print ("backend auto-determined as the least busy:", b)
+    else:
+        b = bs [0]
+    return b
+# >>>
+def _run_aer (qc, shots = 2000, seed = 100): # <<<
+    """
+    Like :func:`~physicsfront.qiskit.run_quantum_simulator`, but runs the
+    circuits as they are (without ``assemble``, which does not take the
+    noise instructions of :func:`_noisy_circuits`).
+    """
+    from qiskit import Aer # pylint: disable=E0611
+    sim = Aer.get_backend ('aer_simulator')
+    return sim.run (qc, shots = shots, memory = True, seed_simulator = seed)
+# >>>
+def _run_quantum_computer (qc, backend, shots = 2000, # <<<
+                           tracer = None):
+    """
+    Like :func:`~physicsfront.qiskit.run_quantum_computer`, but ``qc`` may
+    also be a list of circuits, run as one job (each with ``shots`` shots)
+    on ``backend`` (see :func:`_quantum_computer`), and the circuits are
+    transpiled through the transpile cache (see :func:`transpile_cache`).
+
+    :param tracer:  If given, a :class:`~physicsfront.mqca.tracing.Tracer`
+        to record the transpilation with (and the cache hits and misses).
+    """
+    transpile_cache ()
+    cache = _transpile_cache
+    if isinstance (qc, tuple):
+        qc = list (qc)
+    if tracer is None:
+        runnable = cache.transpile (qc, backend, optimization_level = 3)
+    else:
+        hits, misses = cache.hits, cache.misses
+        with tracer.span ('transpile') as span:
+            runnable = cache.transpile (qc, backend, optimization_level = 3)
+            span.set (cache_hits = cache.hits - hits,
+                      cache_misses = cache.misses - misses)
+    return backend.run (runnable, shots = shots, memory = True)
+# >>>
+def _sweep_point (point): # <<<
+    """
+    Runs :func:`bb84` for one point of :func:`sweep` (a :func:`dict` of its
+    arguments) and returns the row of the sweep table for it.
+    """
+    import time
+    t0 = time.perf_counter ()
+    r = bb84 (** point).wait (interval = .05)
+    t1 = time.perf_counter ()
+    counts = r.counts
+    if isinstance (counts, tuple):
+        from collections import Counter
+        total = Counter ()
+        for c in counts:
+            total.update (c ())
+        counts = total
+    else:
+        counts = counts ()
+    bits = r.bits
+    shots = sum (b.shots for b in (bits if isinstance (bits, tuple)
+                                   else (bits,)))
+    s = r.sift ()
+    t2 = time.perf_counter ()
+    low, high = s.qber_interval
+    return {'shots_run': shots, 'raw_bits': s.shots, 'sifted': s.sifted,
+            'errors': s.errors,
+            'qber': s.qber, 'qber_low': low, 'qber_high': high,
+            'eavesdropper_agreement': s.eavesdropper_agreement,
+            'key_rate': s.key_rate, 'counts': dict (sorted (counts.items ())),
+            'run_seconds': t1 - t0, 'analysis_seconds': t2 - t1}
+# >>>
+def _run_shard (qc, simulate, shots, seed): # <<<
+    """
+    Simulates ``shots`` shots of ``qc`` (a circuit or a list of circuits) in
+    a worker process of :func:`run`, and returns the bit-packed
+    :class:`~physicsfront.mqca.memory.Memory` (or a list of them).
+    """
+    from .memory import Memory, layout_of
+    if simulate == 'analytic':
+        from .analytic import run_analytic
+        res = run_analytic (qc, shots = shots, seed = seed).result ()
+    else:
+        # pylint: disable=E0401,E0611
+        from physicsfront.qiskit import run_quantum_simulator
+        res = run_quantum_simulator (qc, shots = shots, seed = seed).result ()
+    if isinstance (qc, list):
+        return list (Memory.from_result (res, layout_of (q),
+                                         experiment = e).pack ()
+                     for e, q in enumerate (qc))
+    return Memory.from_result (res, layout_of (qc)).pack ()
+# >>>
+def _trace_job (tracer, j, job, res): # <<<
+    """
+    Records the queueing and execution of job ``j`` (with the result
+    ``res``) with ``tracer``, as far as the job or its result reports them.
+    """
+    import time
+    steps = None
+    time_per_step = getattr (job, 'time_per_step', None)
+    if time_per_step is not None: # IBM Quantum jobs
+        try:
+            steps = time_per_step ()
+        except Exception: # pylint: disable=W0703
+            steps = None
+    if steps:
+        def timestamp (name):
+            t = steps.get (name)
+            return None if t is None else t.timestamp ()
+        queued = timestamp ('QUEUED')
+        running = timestamp ('RUNNING')
+        completed = timestamp ('COMPLETED')
+        if queued is not None and running is not None:
+            tracer.record ('queue', queued, running - queued, job = j)
+        if running is not None and completed is not None:
+            tracer.record ('execute', running, completed - running, job = j)
+            return
+    taken = getattr (res, 'time_taken', None) # e.g., Aer
+    if taken:
+        end = time.time ()
+        date = getattr (res, 'date', None)
+        if isinstance (date, str):
+            from datetime import datetime
+            try:
+                end = datetime.fromisoformat (date).timestamp ()
+            except ValueError:
+                pass
+        tracer.record ('execute', end - taken, taken, job = j)
+# >>>
+def _submissions (qc, simulate, shots, seed, max_shots, batch, # <<<
+                  workers, tracer = None, noise_models = None):
+    """
+    Prepares the submission of ``qc`` for :func:`run` and :func:`run_async`.
+
+    :returns:  A 4-tuple ``(qc, as_tuple, submits, parts)``, where ``qc`` is
+        a tuple of circuits, ``submits`` a list of functions, each of which
+        submits one job and returns it, and ``parts`` the job indices per
+        circuit (see :class:`Run`).  If ``tracer`` is given, the submissions
+        are recorded with it.  With ``noise_models``, ``parts`` is a list of
+        them, one per noise model.
+    """
+    import functools
+    import numpy as np
+    if workers and not simulate:
+        raise ValueError ("workers is only for (local) simulation.")
+    qc, as_tuple, allocation = _allocation (qc, shots, seed)
+    circuits = qc
+    backend = None if simulate else _quantum_computer (qc)
+    if max_shots == 'auto':
+        max_shots = None if simulate else _max_shots (backend)
+    if simulate == 'analytic':
+        from .analytic import run_analytic
+        runf = run_analytic
+    elif simulate:
+        # pylint: disable=E0401,E0611
+        from physicsfront.qiskit import run_quantum_simulator
+        runf = run_quantum_simulator
+    else:
+        runf = functools.partial (_run_quantum_computer, backend = backend,
+                                  tracer = tracer)
+    if noise_models is not None:
+        ##
+        # All circuits with all noise models, as one batch (on the same
+        # seeds, so that the noise models are compared on common random
+        # numbers).
+        ##
+        circuits = _noisy_circuits (qc, noise_models, tracer = tracer)
+        allocation = allocation * len (noise_models)
+        runf = _run_aer
+        batch = True
+    def submitter (q, n, seed):
+        if workers:
+            from .analytic import FutureJob
+            return lambda: FutureJob (_process_pool (workers).submit (
+                    _run_shard, q, simulate, n, seed))
+        dargs_runf = {'seed': seed} if simulate else {}
+        return lambda: runf (q, shots = n, ** dargs_runf)
+    def derived_seed (* key):
+        ##
+        # The first chunk (of the first circuit) keeps the seed; the other
+        # chunks and circuits get seeds derived from it, so that they are not
+        # copies of each other (e.g., the static circuits of bb84 with
+        # classical basis choice, which are then scattered into one memory).
+        ##
+        if seed is None or not any (key):
+            return seed
+        return int (np.random.SeedSequence ([seed, * key])
+                    .generate_state (1) [0])
+    chunks = []
+    for n in allocation:
+        k = -(-n // max_shots) if max_shots and n > max_shots else 1
+        if workers:
+            k = max (k, min (workers, n))
+        chunks.append (list (n // k + (c < n % k) for c in range (k)))
+    submits = []
+    parts = list ([] for _ in circuits)
+    if batch:
+        ##
+        # One job per round of chunks, running all circuits that have a chunk
+        # in that round, each with the largest shots in the round (only the
+        # chunk's shots are taken from it).
+        ##
+        for c in range (max (len (ch) for ch in chunks)):
+            members = list (i for i, ch in enumerate (chunks) if c < len (ch))
+            for e, i in enumerate (members):
+                parts [i].append ((len (submits), e, chunks [i] [c]))
+            submits.append (submitter (list (circuits [i] for i in members),
+                                       max (chunks [i] [c] for i in members),
+                                       derived_seed (c)))
+    else:
+        for i, (q, ch) in enumerate (zip (circuits, chunks)):
+            for c, m in enumerate (ch):
+                parts [i].append (len (submits))
+                submits.append (submitter (q, m, derived_seed (i, c)))
+    if tracer is not None:
+        def traced (j, f):
+            def submit ():
+                with tracer.span ('submit', job = j):
+                    return f ()
+            return submit
+        submits = list (traced (j, f) for j, f in enumerate (submits))
+    parts = tuple (tuple (p) for p in parts)
+    if noise_models is not None:
+        n = len (qc)
+        parts = list (parts [k * n : (k + 1) * n]
+                      for k in range (len (noise_models)))
+    return qc, as_tuple, submits, parts
+# >>>
+def run (qc, simulate = True, shots = 10000, seed = 100, # <<<
+         concurrent = False, max_concurrency = 8, max_shots = 'auto',
+         batch = False, workers = None, cache = False, noise_models = None):
     """
     Runs ``qc`` (which can be a quantum circuit or a tuple/list of quantum
     circuits) and returns a tuple of submitted jobs.
 
     Returns a :class:`Run` instance that must be finalized to get results
     when it is know that all jobs finished successfully.
+
+    When ``qc`` is a tuple/list, each shot is run with one of the circuits,
+    chosen uniformly at random.  This split of ``shots`` is drawn from a
+    generator seeded with ``seed``, and so it is reproducible.  Instead,
+    ``shots`` may then also be a tuple/list of the shots of each circuit.
+
+    :param simulate:  If true, the circuits are run on the Aer simulator (see
+        :func:`~physicsfront.qiskit.run_quantum_simulator`), and otherwise on
+        a quantum computer (see
+        :func:`~physicsfront.qiskit.run_quantum_computer`), transpiling the
+        circuits through the transpile cache (see :func:`transpile_cache`).
+
+        If ``'analytic'``, the circuits, which then must have been built by
+        :func:`~physicsfront.mqca.qc_bb84` or
+        :func:`~physicsfront.mqca.qc_for_random_bits`, are not simulated at
+        all: the shots are sampled from the known outcome distributions with
+        NumPy (see :func:`~physicsfront.mqca.analytic.run_analytic`).  The
+        jobs are done as soon as this function returns.
+
+    :param concurrent:  If true, the jobs are submitted in parallel from
+        a pool of at most ``max_concurrency`` threads, instead of one after
+        another.  Either way, this function returns as soon as all jobs are
+        submitted.  See also :func:`run_async`.
+
+    :param max_shots:  The maximum number of shots per job.  The shots of a
+        circuit above it are split into several jobs of (nearly) equal
+        size, whose memory and counts the returned :class:`Run` merges.  The
+        default ``'auto'`` means no limit for simulators and, for quantum
+        computers, the maximum of the backend (chosen once for the whole
+        run), as reported by its configuration (or
+        ``MAX_SHOTS_QUANTUM_COMPUTER`` if it reports none).  ``None`` means
+        no limit.
+
+    :param batch:  If true, all circuits are submitted together as a single
+        job (or one job per chunk, see ``max_shots``), saving the per-job
+        overhead of queueing, transpiling and fetching results.  Since a job
+        runs all its circuits with the same number of shots, the largest
+        share is run, and each circuit takes only its own share from it.
+        The returned :class:`Run` splits the batched result, so that
+        ``result``, ``memory`` and ``counts`` are still per circuit.
+
+    :param workers:  Only for simulation.  If given, the shots of each
+        circuit are split into (at least) ``workers`` shards of (nearly)
+        equal size, which are simulated in a pool of ``workers`` local
+        processes.  Each shard gets its own seed, derived from ``seed``, and
+        the memory is merged in shard order, so that the same ``seed`` and
+        ``workers`` always give the same result.  The jobs of the returned
+        :class:`Run` are :class:`~physicsfront.mqca.analytic.FutureJob`
+        instances.  The worker processes are spawned (not forked), so that a
+        script using them needs the ``if __name__ == '__main__':`` guard.
+
+    :param cache:  If true (and ``simulate`` is true and ``seed`` is not
+        ``None``, so that the run is deterministic), the memory of the run
+        is looked up in the on-disk result cache (see :func:`result_cache`),
+        keyed on the structure of the circuits, ``shots``, ``seed``, the
+        backend, ``max_shots``, ``batch`` and ``workers``.  On a hit,
+        nothing is run, and the returned :class:`Run` is finalized already.
+        On a miss, the memory is stored in the cache once the run is
+        finalized.  A :class:`~physicsfront.mqca.resultcache.ResultCache`
+        instance may be given to use instead of the default cache.
+
+    :param noise_models:  Only for simulation on Aer.  If given, a list of
+        Aer noise models (``qiskit_aer.noise.NoiseModel``), with each of
+        which ``qc`` is run, and a list of :class:`Run` instances, one per
+        noise model, is returned instead.  The circuits are transpiled once
+        (per set of basis gates of the noise models), the errors of each
+        noise model are inserted into them as instructions, and all of them
+        are run as one batch, with the same seeds (and the same split of
+        ``shots``) for all noise models.  Readout errors are not supported.
     """
-    # pylint: disable=E0401,E0611,W0611
-    from physicsfront.qiskit import (run_quantum_computer,
-                                     run_quantum_simulator)
-    from collections import Counter
-    from random import randint
-    shots_counter = None
-    as_tuple = isinstance (qc, (tuple, list))
-    if as_tuple:
-        qc = tuple (qc)
-        N = len (qc) - 1
-        assert N >= 0
-        shots_counter = Counter (randint (0, N) for i in range (shots))
+    _check_noise_models (noise_models, simulate, workers, cache)
+    ans, entry = _cached_run (qc, simulate, shots, seed, max_shots, batch,
+                              workers, cache)
+    if ans is not None:
+        return ans
+    from .tracing import Tracer
+    tracer = Tracer ()
+    qc, as_tuple, submits, parts = _submissions (qc, simulate, shots, seed,
+                                                 max_shots, batch, workers,
+                                                 tracer = tracer,
+                                                 noise_models = noise_models)
+    if concurrent and len (submits) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor (max_workers = max (1, min (max_concurrency,
+                                 len (submits)))) as ex:
+            jobs = tuple (ex.map (lambda f: f (), submits))
+    else:
+        jobs = tuple (f () for f in submits)
+    if noise_models is not None:
+        return _noise_model_runs (qc, jobs, as_tuple, parts, tracer)
+    ans = Run (qc, jobs, take_value_if_single = not as_tuple, parts = parts,
+               tracer = tracer)
+    ans._cache_entry = entry
+    return ans
+# >>>
+async def run_async (qc, simulate = True, shots = 10000, seed = 100, # <<<
+                     max_concurrency = 8, max_shots = 'auto', batch = False,
+                     workers = None, cache = False, noise_models = None):
+    """
+    A coroutine version of :func:`run`: the jobs are submitted in parallel
+    (at most ``max_concurrency`` at a time) without blocking the event loop,
+    and the :class:`Run` is returned once all jobs are submitted.
+    """
+    import asyncio
+    _check_noise_models (noise_models, simulate, workers, cache)
+    ans, entry = _cached_run (qc, simulate, shots, seed, max_shots, batch,
+                              workers, cache)
+    if ans is not None:
+        return ans
+    from .tracing import Tracer
+    tracer = Tracer ()
+    qc, as_tuple, submits, parts = _submissions (qc, simulate, shots, seed,
+                                                 max_shots, batch, workers,
+                                                 tracer = tracer,
+                                                 noise_models = noise_models)
+    semaphore = asyncio.Semaphore (max (1, max_concurrency))
+    loop = asyncio.get_running_loop ()
+    async def submit_async (f):
+        async with semaphore:
+            return await loop.run_in_executor (None, f)
+    jobs = await asyncio.gather (* (submit_async (f) for f in submits))
+    if noise_models is not None:
+        return _noise_model_runs (qc, tuple (jobs), as_tuple, parts, tracer)
+    ans = Run (qc, tuple (jobs), take_value_if_single = not as_tuple,
+               parts = parts, tracer = tracer)
+    ans._cache_entry = entry
+    return ans
+# >>>
+def result_cache (directory = None, max_bytes = None, clear = False): # <<<
+    """
+    Configures and inspects the on-disk result cache that :func:`run` uses
+    when passed ``cache = True``.
+
+    :param directory:  If given, the cache directory is set to it (see
+        :class:`~physicsfront.mqca.resultcache.ResultCache` for the
+        default).
+
+    :param max_bytes:  If given, sets the maximum total size of the cache
+        files, beyond which least recently used files are deleted.
+
+    :param clear:  If true, all cache files are deleted.
+
+    :returns:  A :func:`dict` with the keys ``'directory'``,
+        ``'max_bytes'``, ``'entries'``, ``'bytes'``, ``'hits'`` and
+        ``'misses'``.
+    """
+    global _result_cache # pylint: disable=W0603
+    from .resultcache import ResultCache
+    if _result_cache is None:
+        _result_cache = ResultCache (directory = directory)
+    elif directory is not None:
+        _result_cache = ResultCache (directory = directory,
+                                     max_bytes = _result_cache.max_bytes)
+    cache = _result_cache
+    if max_bytes is not None:
+        cache.max_bytes = max_bytes
+        cache.trim ()
+    if clear:
+        cache.clear ()
+    return cache.info ()
+# >>>
+def sweep (grid, workers = None, checkpoint = None, ** kwargs): # <<<
+    """
+    Runs :func:`bb84` over a grid of parameters, in a pool of processes, and
+    returns a table of the results.
+
+    :param grid:  Either a :func:`dict` that maps argument names of
+        :func:`bb84` (such as ``'shots'``, ``'basis12'``, ``'kind'`` or
+        ``'party3'``) to lists of values, whose product is swept, or a list
+        of :func:`dict` instances, one per point.
+
+    :param workers:  The number of processes (by default, the number of
+        CPUs), which are spawned (see ``workers`` of :func:`run`).  With 0,
+        the points are run one after another in this process.
+
+    :param checkpoint:  If given, the path of a JSON lines file, to which
+        each point is appended as soon as it completes.  Points found in
+        this file already (with the same arguments) are not run again, so
+        that an interrupted sweep picks up where it stopped.
+
+    :param kwargs:  Arguments of :func:`bb84` shared by all points.  Unless
+        a point sets ``seed``, it gets its own seed, derived from ``seed``
+        (100 by default) and the index of the point in the grid.  ``seed =
+        None`` means a fresh seed for every point.
+
+    :returns:  A :func:`dict` of columns, one NumPy array per column, with
+        one row per point (in grid order): a column per swept argument and
+        ``seed``, then ``shots_run`` (the shots submitted), ``raw_bits``
+        (the raw key bits, ``pairs`` per shot), ``sifted``, ``errors``,
+        ``qber``, ``qber_low``, ``qber_high``, ``eavesdropper_agreement``,
+        ``key_rate``, ``counts`` (an object array of :func:`dict`),
+        ``run_seconds`` and ``analysis_seconds`` (both measured in the
+        worker).
+    """
+    import inspect, itertools, json, os
+    import numpy as np
+    if isinstance (grid, dict):
+        names = list (grid)
+        points = list (dict (zip (names, values)) for values
+                       in itertools.product (* (grid [n] for n in names)))
     else:
-        qc = (qc,)
-        shots_counter = Counter ({0: shots})
-    # pylint: enable=E0401,E0611,W0611
-    dargs_runf = {'seed': seed} if simulate else {}
-    runf = run_quantum_simulator if simulate else run_quantum_computer
-    jobs = tuple (runf (q, shots = shots_counter [i], ** dargs_runf)
-                  for i, q in enumerate (qc))
-    return Run (qc, jobs, take_value_if_single = not as_tuple)
+        points = list (dict (p) for p in grid)
+        names = list (dict.fromkeys (n for p in points for n in p))
+    seed = kwargs.pop ('seed', 100)
+    for i, p in enumerate (points):
+        if 'seed' not in p:
+            p ['seed'] = seed if seed is None else int (
+                    np.random.SeedSequence ([seed, i]).generate_state (1) [0])
+    if 'seed' not in names:
+        names.append ('seed')
+    args = list (dict (kwargs, ** p) for p in points)
+    def point_key (a):
+        return json.dumps (a, sort_keys = True, default = repr)
+    rows = [None] * len (points)
+    done = {}
+    if checkpoint and os.path.exists (checkpoint):
+        with open (checkpoint, encoding = 'utf-8') as f:
+            for line in f:
+                line = line.strip ()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads (line)
+                except ValueError: # a line cut short by an interruption
+                    continue
+                done [entry ['key']] = entry ['row']
+    todo = []
+    for i, a in enumerate (args):
+        row = done.get (point_key (a))
+        if row is not None and a ['seed'] is not None:
+            rows [i] = row
+        else:
+            todo.append (i)
+    f = open (checkpoint, 'a', encoding = 'utf-8') if checkpoint else None
+    try:
+        def completed (i, row):
+            rows [i] = row
+            if f is not None:
+                f.write (json.dumps ({'key': point_key (args [i]),
+                                     'row': row}) + '\n')
+                f.flush ()
+        if workers == 0 or len (todo) <= 1:
+            for i in todo:
+                completed (i, _sweep_point (args [i]))
+        else:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            with ProcessPoolExecutor (max_workers = workers,
+                                      mp_context = _process_context ()
+                                      ) as ex:
+                futures = dict ((ex.submit (_sweep_point, args [i]), i)
+                                for i in todo)
+                for fut in as_completed (futures):
+                    completed (futures [fut], fut.result ())
+    finally:
+        if f is not None:
+            f.close ()
+    def column (values):
+        types = set (type (v) for v in values)
+        if types and (types <= {int, float} or types == {bool}):
+            return np.array (values)
+        ans = np.empty (len (values), dtype = object)
+        ans [:] = values
+        return ans
+    defaults = dict ((n, p.default) for n, p
+                     in inspect.signature (bb84).parameters.items ())
+    ans = dict ((n, column (list (a.get (n, defaults.get (n)) for a in args)))
+                for n in names)
+    ##
+    # Rows from an older checkpoint may lack some columns (None).
+    ##
+    for n in dict.fromkeys (n for row in rows for n in row):
+        values = list (row.get (n) for row in rows)
+        ans [n] = column (list (float ('nan') if v is None else v
+                                for v in values)
+                          if n == 'eavesdropper_agreement' else values)
+    return ans
+# >>>
+def transpile_cache (enabled = None, directory = None, maxsize = None, # <<<
+                     clear = False):
+    """
+    Configures and inspects the transpile cache that :func:`run` uses for
+    the circuits it runs on quantum computers (see
+    :class:`~physicsfront.mqca.transpilecache.TranspileCache`): circuits of
+    the same structure are transpiled only once per backend, however many
+    times (and with whatever shots or seeds) they are run.
+
+    :param enabled:  If given, turns the cache on (true value) or off (false
+        value).
+
+    :param directory:  If given, the transpiled circuits are also stored in
+        this directory (as QPY files), to be reused by other processes.  By
+        default, they are held in memory only.
+
+    :param maxsize:  If given, sets the maximum number of transpiled
+        circuits held in memory.
+
+    :param clear:  If true, the cached circuits (also those in
+        ``directory``) and statistics are cleared.
+
+    :returns:  A :func:`dict` with the keys ``'enabled'``, ``'directory'``,
+        ``'maxsize'``, ``'size'``, ``'hits'``, ``'misses'`` and
+        ``'hit_rate'``.
+    """
+    global _transpile_cache # pylint: disable=W0603
+    from .transpilecache import TranspileCache
+    if _transpile_cache is None:
+        _transpile_cache = TranspileCache (directory = directory)
+    elif directory is not None:
+        _transpile_cache = TranspileCache (directory = directory,
+                                           maxsize = _transpile_cache.maxsize,
+                                           enabled = _transpile_cache.enabled)
+    cache = _transpile_cache
+    if enabled is not None:
+        cache.enabled = bool (enabled)
+    if maxsize is not None:
+        cache.maxsize = maxsize
+    if clear:
+        cache.clear (disk = True)
+    return cache.info ()
 # >>>
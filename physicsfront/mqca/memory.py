@@ -0,0 +1,394 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+Compact, NumPy based representation of the per-shot memory of a run.
+
+The memory of a qiskit job result (``result.get_memory ()``) is a list of
+strings, one per shot, such as ``'0 1 1 1 0'``.  Here, it is held instead as
+one column per classical bit, either as a ``uint8`` array (one byte per bit)
+or bit-packed (one bit per bit), optionally in a memory-mapped file.
+"""
+
+class Memory (object): # <<<
+
+    """
+    The per-shot memory of one experiment (circuit).
+
+    :param data:  A ``uint8`` array of shape ``(number_of_clbits, shots)``
+        if not ``packed``, or, if ``packed``, of shape
+        ``(number_of_clbits, ceil (shots / 8))`` holding the same columns
+        packed by :func:`numpy.packbits`.
+
+        The columns (rows of ``data``) are the classical bits in the order of
+        the classical registers in ``layout``, which is the same order as in
+        ``QuantumCircuit.clbits``.
+
+    :param layout:  A sequence of ``(name, size)`` pairs, one for each
+        classical register.
+
+    :param shots:  Required only if ``packed``.
+    """
+
+    def __init__ (self, data, layout, packed = False, shots = None):
+        self._data = data
+        self._layout = layout = tuple ((str (n), int (s)) for n, s in layout)
+        self._packed = bool (packed)
+        nbits = sum (s for _, s in layout)
+        if data.ndim != 2 or data.shape [0] != nbits:
+            raise ValueError ("data does not match layout.")
+        if packed:
+            if shots is None or (shots + 7) // 8 != data.shape [1]:
+                raise ValueError ("shots does not match packed data.")
+        else:
+            shots = data.shape [1]
+        self._shots = shots
+        self._offsets = offsets = {}
+        offset = 0
+        for name, size in layout:
+            offsets [name] = (offset, size)
+            offset += size
+
+    def __len__ (self):
+        return self._shots
+
+    def __getitem__ (self, spec):
+        """
+        Returns the column(s) for the classical bit specification ``spec``,
+        which is either a classical register name or a 2-tuple
+        ``(name, index)`` (``index`` may be negative).  As in
+        :func:`~physicsfront.qiskit.memory_item_index`, ``name`` may be any
+        part of a register name as long as it identifies the register
+        uniquely.
+
+        A ``uint8`` array of length ``shots`` is returned, except when
+        ``spec`` is a register name of a register of size other than 1, in
+        which case the array has the shape ``(shots, size)``.
+        """
+        if isinstance (spec, tuple):
+            name, index = spec
+            return self.column (self.clbit_index (name, index))
+        regname = self.regname (spec)
+        offset, size = self._offsets [regname]
+        if size == 1:
+            return self.column (offset)
+        return self.to_array (range (offset, offset + size))
+
+    @property
+    def layout (self):
+        return self._layout
+
+    @property
+    def nbits (self):
+        return self._data.shape [0]
+
+    @property
+    def nbytes (self):
+        return self._data.nbytes
+
+    @property
+    def packed (self):
+        return self._packed
+
+    @property
+    def shots (self):
+        return self._shots
+
+    def clbit_index (self, name, index = None):
+        """
+        Returns the column index for the classical bit ``index`` (which may be
+        negative) of the register identified by ``name``.  ``index`` may be
+        omitted for a register of size 1.
+        """
+        regname = self.regname (name)
+        offset, size = self._offsets [regname]
+        if index is None:
+            if size != 1:
+                raise ValueError (f"Register {regname!r} has {size} bits; an "
+                                  "index is required.")
+            index = 0
+        if not -size <= index < size:
+            raise IndexError (f"Index {index} out of range for register "
+                              f"{regname!r}.")
+        return offset + index % size
+
+    def column (self, i):
+        """
+        Returns the ``uint8`` array of length ``shots`` for the classical bit
+        with column index ``i``.
+        """
+        if self._packed:
+            import numpy as np
+            return np.unpackbits (self._data [i], count = self._shots)
+        return self._data [i]
+
+    def pack (self):
+        """
+        Returns a bit-packed version of this memory (or this memory itself if
+        already packed).
+        """
+        if self._packed:
+            return self
+        import numpy as np
+        return Memory (np.packbits (self._data, axis = 1), self._layout,
+                       packed = True, shots = self._shots)
+
+    def regname (self, name):
+        """
+        Completes ``name`` to the unique classical register name containing
+        it (see :meth:`__getitem__`).
+        """
+        if name in self._offsets:
+            return name
+        cands = list (n for n in self._offsets if name in n)
+        if len (cands) != 1:
+            raise ValueError (f'Name {name!r} does not complete a classical '
+                              'bit register name (uniquely).')
+        return cands [0]
+
+    def select (self, index):
+        """
+        Returns the memory of the shots selected by ``index`` (a slice, or an
+        array of shot indices or of booleans), in the selected order.
+        """
+        import numpy as np
+        data = self.unpack ()._data [:, index]
+        ans = Memory (np.ascontiguousarray (data), self._layout)
+        return ans.pack () if self._packed else ans
+
+    def spill (self, path):
+        """
+        Writes the bit-packed memory to the ``.npy`` file ``path`` and returns
+        a packed memory backed by that file (memory-mapped read-only).
+        """
+        import numpy as np
+        data = self.pack ()._data
+        mm = np.lib.format.open_memmap (path, mode = 'w+', dtype = np.uint8,
+                                        shape = data.shape)
+        mm [...] = data
+        mm.flush ()
+        del mm
+        return Memory (np.load (path, mmap_mode = 'r'), self._layout,
+                       packed = True, shots = self._shots)
+
+    def to_array (self, columns = None):
+        """
+        Returns a ``uint8`` array of shape ``(shots, len (columns))`` with the
+        given column indices (all columns by default).
+        """
+        import numpy as np
+        if columns is None:
+            columns = range (self.nbits)
+        columns = list (columns)
+        if not self._packed:
+            return np.ascontiguousarray (self._data [columns].T)
+        ans = np.empty ((self._shots, len (columns)), dtype = np.uint8)
+        for j, i in enumerate (columns):
+            ans [:, j] = self.column (i)
+        return ans
+
+    def to_strings (self):
+        """
+        Returns the memory in the format of qiskit ``result.get_memory ()``.
+        """
+        return format_memory (self.to_array (), self._layout)
+
+    def unpack (self):
+        """
+        Returns an unpacked (one byte per bit) version of this memory (or this
+        memory itself if not packed).
+        """
+        if not self._packed:
+            return self
+        import numpy as np
+        return Memory (np.unpackbits (self._data, axis = 1,
+                                      count = self._shots),
+                       self._layout)
+
+    @classmethod
+    def concat (cls, memories):
+        """
+        Concatenates the shots of ``memories``, which must share the same
+        layout.  The result is packed if any of ``memories`` is.
+        """
+        import numpy as np
+        memories = list (memories)
+        if not memories:
+            raise ValueError ("Nothing to concatenate.")
+        if len (memories) == 1:
+            return memories [0]
+        layout = memories [0].layout
+        if any (m.layout != layout for m in memories):
+            raise ValueError ("Memories with different layouts can't be "
+                              "concatenated.")
+        ans = cls (np.concatenate (list (m.unpack ()._data for m in memories),
+                                   axis = 1), layout)
+        if any (m.packed for m in memories):
+            ans = ans.pack ()
+        return ans
+
+    @classmethod
+    def from_array (cls, bits, layout):
+        """
+        Creates a memory from the ``uint8`` array ``bits`` of shape
+        ``(shots, number_of_clbits)``.
+        """
+        import numpy as np
+        return cls (np.ascontiguousarray (np.asarray (bits, dtype = np.uint8)
+                                          .T), layout)
+
+    @classmethod
+    def from_result (cls, res, layout, experiment = None):
+        """
+        Creates a memory from the qiskit job result ``res`` of a circuit with
+        the classical register ``layout``.
+        """
+        memories = getattr (res, 'memory_objects', None)
+        if memories is not None:
+            return memories [experiment or 0]
+        import numpy as np
+        nbits = sum (s for _, s in layout)
+        hexmem = None
+        if 0 < nbits <= 64:
+            try:
+                data = res.data (experiment)
+            except Exception: # pylint: disable=W0703
+                data = None
+            hexmem = (data or {}).get ('memory')
+        if not hexmem or not isinstance (hexmem [0], str):
+            return cls.from_strings (res.get_memory (experiment), layout)
+        ##
+        # Hexadecimal memory: bit i of the value is classical bit i.
+        ##
+        values = np.fromiter ((int (h, 16) for h in hexmem),
+                              dtype = np.uint64, count = len (hexmem))
+        data = np.empty ((nbits, len (values)), dtype = np.uint8)
+        for i in range (nbits):
+            data [i] = (values >> np.uint64 (i)) & np.uint64 (1)
+        return cls (data, layout)
+
+    @classmethod
+    def from_strings (cls, memory, layout):
+        """
+        Creates a memory from the list of memory strings ``memory`` (as
+        returned by qiskit ``result.get_memory ()``).
+        """
+        import numpy as np
+        layout = tuple (layout)
+        nbits = sum (s for _, s in layout)
+        shots = len (memory)
+        if not shots or not nbits:
+            return cls (np.zeros ((nbits, shots), dtype = np.uint8), layout)
+        width = len (memory [0])
+        chars = np.frombuffer (''.join (memory).encode ('ascii'),
+                               dtype = np.uint8)
+        if chars.size != width * shots:
+            raise ValueError ("Memory strings are not of equal length.")
+        chars = chars.reshape (shots, width)
+        positions = _char_positions (layout)
+        if len (positions) != width:
+            raise ValueError ("Memory strings do not match layout.")
+        data = np.empty ((nbits, shots), dtype = np.uint8)
+        for p, i in enumerate (positions):
+            if i >= 0:
+                np.subtract (chars [:, p], ord ('0'), out = data [i])
+        return cls (data, layout)
+
+    @classmethod
+    def scatter (cls, memories, positions, layout, fills = None):
+        """
+        Creates a memory with the classical register ``layout`` from
+        ``memories``, such that shot ``j`` of ``memories [k]`` becomes shot
+        ``positions [k] [j]``.  The positions must cover each shot exactly
+        once.
+
+        :param fills:  For each of ``memories``, a :func:`dict` that maps the
+            names of the registers of ``layout`` missing in that memory to
+            the constant bit (all bits of the register) to fill them with.
+        """
+        import numpy as np
+        layout = tuple (layout)
+        nbits = sum (s for _, s in layout)
+        shots = sum (len (p) for p in positions)
+        data = np.empty ((nbits, shots), dtype = np.uint8)
+        if fills is None:
+            fills = [{}] * len (memories)
+        for m, pos, fill in zip (memories, positions, fills):
+            if m.shots != len (pos):
+                raise ValueError ("Memory does not match its positions.")
+            offset = 0
+            for name, size in layout:
+                if name in m._offsets:
+                    for b in range (size):
+                        data [offset + b, pos] = m.column (
+                                m.clbit_index (name, b))
+                elif name in fill:
+                    data [offset : offset + size, pos] = fill [name]
+                else:
+                    raise ValueError (f"No bits for register {name!r}.")
+                offset += size
+        return cls (data, layout)
+
+# >>>
+
+def _char_positions (layout): # <<<
+    """
+    Returns the list of column indices, one per character of a memory string
+    for ``layout``, with -1 for the spaces separating registers.
+    """
+    positions = []
+    offset = sum (size for _, size in layout)
+    for _, size in reversed (layout):
+        offset -= size
+        if positions:
+            positions.append (-1)
+        positions.extend (range (offset + size - 1, offset - 1, -1))
+    return positions
+# >>>
+def format_memory (bits, layout): # <<<
+    """
+    Formats the rows of the ``uint8`` array ``bits`` of shape ``(shots,
+    number_of_clbits)`` as qiskit memory strings: one group of bits per
+    classical register, separated by a space, with the last register (and the
+    last bit of each register) leftmost.
+    """
+    import numpy as np
+    positions = _char_positions (layout)
+    shots = bits.shape [0]
+    width = len (positions)
+    if not width:
+        return [''] * shots
+    chars = np.full ((shots, width), ord (' '), dtype = np.uint8)
+    positions = np.array (positions)
+    is_bit = positions >= 0
+    chars [:, is_bit] = bits [:, positions [is_bit]] + ord ('0')
+    return (chars.view (f'S{width}').ravel ().astype (f'U{width}')
+            .tolist ())
+# >>>
+def layout_of (qc): # <<<
+    """
+    Returns the classical register layout (a tuple of ``(name, size)``) of
+    ``qc``.
+    """
+    cregs = getattr (qc, 'cregs', None)
+    if cregs is not None:
+        return tuple ((r.name, r.size) for r in cregs)
+    dargs = getattr (qc, '_dargs', None) or {}
+    if 'party1' in dargs and 'party2' in dargs:
+        from .analytic import bb84_layout
+        return bb84_layout (dargs)
+    raise TypeError ("Can't determine the classical registers of qc.")
+# >>>
@@ -0,0 +1,240 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+A buffered, streaming quantum random number generator (QRNG) on top of
+:func:`~physicsfront.mqca.qc_for_random_bits`.
+"""
+
+class QRNG (object): # <<<
+
+    """
+    A source of random bits, measured from maximally superposed qubits.
+
+    Jobs of a circuit of ``qubits`` qubits (see
+    :func:`~physicsfront.mqca.qc_for_random_bits`, with ``prep =
+    'gates'``), each of ``shots`` shots, are run in the background (at most
+    ``prefetch`` at a time), and their bits are kept, packed, in a ring
+    buffer of ``buffer_bytes`` bytes.  A new job is submitted whenever the
+    buffer has room for its bits, so that reading blocks only when the
+    buffer runs dry.
+
+    The bits are read with :meth:`read` (bytes), :meth:`bits` (a NumPy
+    array of bits), :meth:`randbits` (an integer), or by iterating (one bit
+    at a time).  :meth:`stats` reports the throughput.
+
+    Use :meth:`close` (or a ``with`` statement) to stop the background jobs.
+
+    :param simulate:  As for :func:`~physicsfront.mqca.experiment.run`.
+        Bits from simulations are, of course, pseudo-random.
+
+    :param seed:  For simulations only.  ``None`` (the default) means a
+        fresh seed for each job; with a seed, job ``k`` gets a seed derived
+        from it, so that the stream of bits is reproducible.
+    """
+
+    def __init__ (self, qubits = 16, shots = 4096, simulate = True,
+                  seed = None, buffer_bytes = 1 << 20, prefetch = 2):
+        import threading, time
+        import numpy as np
+        from physicsfront.mqca import qc_for_random_bits # pylint: disable=E0401,E0611
+        self.qc = qc_for_random_bits (qubits = qubits, prep = 'gates')
+        self.shots = shots
+        self.simulate = simulate
+        self.seed = seed
+        self.prefetch = max (1, prefetch)
+        self._job_bytes = shots * qubits // 8
+        if not self._job_bytes:
+            raise ValueError ("A job must yield at least 8 bits "
+                              "(shots * qubits).")
+        self._capacity = max (buffer_bytes, self._job_bytes)
+        self._buffer = np.empty (self._capacity, dtype = np.uint8)
+        self._head = 0 # read position
+        self._size = 0 # buffered bytes
+        self._cond = threading.Condition ()
+        self._closed = False
+        self._error = None
+        self._submits = 0
+        self._jobs = 0
+        self._job_seconds = 0.
+        self._bytes_generated = 0
+        self._bytes_read = 0
+        self._waits = 0
+        self._wait_seconds = 0.
+        self._started = time.monotonic ()
+        self._bits = None # unread bits of the last byte (see __next__)
+        self._thread = threading.Thread (target = self._produce,
+                                         name = 'QRNG', daemon = True)
+        self._thread.start ()
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, * exc_info):
+        self.close ()
+        return False
+
+    def __iter__ (self):
+        return self
+
+    def __next__ (self):
+        """
+        Returns the next random bit (0 or 1).
+        """
+        if not self._bits: # read 64 bytes at a time
+            self._bits = list (self.bits (8 * 64).tolist ())
+            self._bits.reverse ()
+        return self._bits.pop ()
+
+    def _collect (self, run):
+        """
+        Waits for ``run`` and returns its bits, packed.
+        """
+        import numpy as np
+        run.wait (interval = .01)
+        bits = run.bits.to_array ().ravel ()
+        n = len (bits) // 8 * 8
+        return np.packbits (bits [: n])
+
+    def _produce (self):
+        import collections, time
+        inflight = collections.deque ()
+        try:
+            while True:
+                with self._cond:
+                    if self._closed:
+                        return
+                    room = self._capacity - self._size - (
+                            len (inflight) * self._job_bytes)
+                    submit = (room >= self._job_bytes and
+                              len (inflight) < self.prefetch)
+                    if not submit and not inflight:
+                        self._cond.wait ()
+                        continue
+                if submit:
+                    inflight.append ((time.monotonic (), self._submit ()))
+                    continue
+                t0, run = inflight.popleft ()
+                data = self._collect (run)
+                with self._cond:
+                    self._jobs += 1
+                    self._job_seconds += time.monotonic () - t0
+                    self._write (data)
+                    self._cond.notify_all ()
+        except BaseException as e: # pylint: disable=W0703
+            with self._cond:
+                self._error = e
+                self._cond.notify_all ()
+
+    def _submit (self):
+        from .experiment import run
+        seed = self.seed
+        if seed is not None:
+            import numpy as np
+            seed = int (np.random.SeedSequence ([seed, self._submits])
+                        .generate_state (1) [0])
+        self._submits += 1
+        return run (self.qc, simulate = self.simulate, shots = self.shots,
+                    seed = seed)
+
+    def _write (self, data):
+        """
+        Appends ``data`` to the ring buffer (which has room for it).
+        """
+        n = len (data)
+        start = (self._head + self._size) % self._capacity
+        first = min (n, self._capacity - start)
+        self._buffer [start : start + first] = data [: first]
+        self._buffer [: n - first] = data [first :]
+        self._size += n
+        self._bytes_generated += n
+
+    def bits (self, n):
+        """
+        Returns ``n`` random bits as a ``uint8`` array.
+        """
+        import numpy as np
+        return np.unpackbits (np.frombuffer (self.read ((n + 7) // 8),
+                                             dtype = np.uint8), count = n)
+
+    def close (self):
+        """
+        Stops submitting jobs.  Jobs in flight are left to finish.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all ()
+
+    def randbits (self, k):
+        """
+        Returns a random non-negative integer of ``k`` bits.
+        """
+        ans = int.from_bytes (self.read ((k + 7) // 8), 'big')
+        return ans >> ((8 - k % 8) % 8)
+
+    def read (self, n):
+        """
+        Returns ``n`` random bytes, blocking until they are available.
+        """
+        import time
+        out = bytearray ()
+        with self._cond:
+            t0 = None
+            while len (out) < n:
+                if self._error is not None:
+                    raise self._error
+                if not self._size:
+                    if self._closed:
+                        raise ValueError ("read from a closed QRNG.")
+                    if t0 is None:
+                        t0 = time.monotonic ()
+                        self._waits += 1
+                    self._cond.wait ()
+                    continue
+                k = min (n - len (out), self._size,
+                         self._capacity - self._head)
+                out += self._buffer [self._head : self._head + k].tobytes ()
+                self._head = (self._head + k) % self._capacity
+                self._size -= k
+                self._bytes_read += k
+                self._cond.notify_all () # room for the next job
+            if t0 is not None:
+                self._wait_seconds += time.monotonic () - t0
+        return bytes (out)
+
+    def stats (self):
+        """
+        Returns a :func:`dict` of statistics: ``'jobs'`` (finished),
+        ``'bits_generated'``, ``'bits_read'``, ``'bits_buffered'``,
+        ``'job_seconds'`` (total time from submission to collection of the
+        jobs), ``'throughput'`` (bits generated per second since this
+        generator started), ``'waits'`` (how many reads blocked) and
+        ``'wait_seconds'`` (total time reads blocked).
+        """
+        import time
+        with self._cond:
+            elapsed = time.monotonic () - self._started
+            return {'jobs': self._jobs,
+                    'bits_generated': 8 * self._bytes_generated,
+                    'bits_read': 8 * self._bytes_read,
+                    'bits_buffered': 8 * self._size,
+                    'job_seconds': self._job_seconds,
+                    'throughput': (8 * self._bytes_generated / elapsed
+                                   if elapsed else 0.),
+                    'waits': self._waits,
+                    'wait_seconds': self._wait_seconds}
+
+# >>>
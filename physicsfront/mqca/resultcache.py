@@ -0,0 +1,240 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+Content-addressed, on-disk cache of the memory of (deterministic) simulator
+runs.
+
+A simulator run with a fixed seed always gives the same memory, so it is
+stored once, under a hash of everything that determines it (the structure of
+the circuits, the shots, the seed and the backend), as bit-packed NumPy
+arrays.  See ``physicsfront.mqca.experiment.run (qc, cache = True)``.
+"""
+
+DEFAULT_DIRECTORY = '~/.cache/physicsfront-mqca/results'
+DEFAULT_MAX_BYTES = 1 << 30
+
+class ResultCache (object): # <<<
+
+    """
+    A directory of cached run memories (one ``.npz`` file per run), of at
+    most ``max_bytes`` bytes in total: least recently used files are deleted
+    once the total grows beyond that.
+
+    :param directory:  The cache directory, created when first written to.
+        By default, the value of the environment variable
+        ``PHYSICSFRONT_MQCA_CACHE`` if set, and otherwise
+        ``DEFAULT_DIRECTORY``.
+    """
+
+    def __init__ (self, directory = None, max_bytes = DEFAULT_MAX_BYTES):
+        import os
+        if directory is None:
+            directory = os.environ.get ('PHYSICSFRONT_MQCA_CACHE',
+                                        DEFAULT_DIRECTORY)
+        self.directory = os.path.expanduser (directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _entries (self):
+        """
+        Returns a list of ``(mtime, size, path)`` of the cache files.
+        """
+        import os
+        ans = []
+        try:
+            names = os.listdir (self.directory)
+        except FileNotFoundError:
+            return ans
+        for name in names:
+            if not name.endswith ('.npz'):
+                continue
+            path = os.path.join (self.directory, name)
+            try:
+                st = os.stat (path)
+            except FileNotFoundError: # evicted concurrently
+                continue
+            ans.append ((st.st_mtime, st.st_size, path))
+        return ans
+
+    def _path (self, key):
+        import os
+        return os.path.join (self.directory, key + '.npz')
+
+    def clear (self):
+        """
+        Deletes all cache files (and resets the statistics).
+        """
+        import os
+        for _, _, path in self._entries ():
+            try:
+                os.remove (path)
+            except FileNotFoundError:
+                pass
+        self.hits = 0
+        self.misses = 0
+
+    def get (self, key):
+        """
+        Returns the list of :class:`~physicsfront.mqca.memory.Memory`
+        instances stored under ``key`` (bit-packed), or ``None``.
+        """
+        import json, os
+        import numpy as np
+        from .memory import Memory
+        path = self._path (key)
+        try:
+            with np.load (path) as f:
+                layouts = json.loads (str (f ['layouts']))
+                shots = f ['shots'].tolist ()
+                ans = list (Memory (f [f'data{i}'], layout, packed = True,
+                                    shots = n)
+                            for i, (layout, n) in enumerate (zip (layouts,
+                                                                  shots)))
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            self.misses += 1
+            return None
+        try:
+            os.utime (path) # most recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return ans
+
+    def info (self):
+        entries = self._entries ()
+        return {'directory': self.directory, 'max_bytes': self.max_bytes,
+                'entries': len (entries),
+                'bytes': sum (size for _, size, _ in entries),
+                'hits': self.hits, 'misses': self.misses}
+
+    def put (self, key, memories):
+        """
+        Stores the list of :class:`~physicsfront.mqca.memory.Memory`
+        instances ``memories`` under ``key``, and then evicts least recently
+        used files as necessary.
+        """
+        import json, os, tempfile
+        import numpy as np
+        os.makedirs (self.directory, exist_ok = True)
+        arrays = dict ((f'data{i}', m.pack ()._data)
+                       for i, m in enumerate (memories))
+        arrays ['layouts'] = np.array (json.dumps (list (m.layout for m
+                                                         in memories)))
+        arrays ['shots'] = np.array (list (m.shots for m in memories),
+                                     dtype = np.int64)
+        ##
+        # Written to a temporary file first, so that readers (possibly in
+        # other processes) never see a partial file.
+        ##
+        fd, tmp = tempfile.mkstemp (dir = self.directory, suffix = '.tmp')
+        try:
+            with os.fdopen (fd, 'wb') as f:
+                np.savez (f, ** arrays)
+            os.replace (tmp, self._path (key))
+        except BaseException:
+            os.remove (tmp)
+            raise
+        self.trim ()
+
+    def trim (self, max_bytes = None):
+        """
+        Deletes least recently used files until the cache holds at most
+        ``max_bytes`` (by default, ``self.max_bytes``) bytes.
+        """
+        import os
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        if max_bytes is None:
+            return
+        entries = sorted (self._entries ())
+        total = sum (size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove (path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+# >>>
+
+def _canonical (value): # <<<
+    """
+    Returns a canonical, JSON serializable form of an instruction parameter
+    or condition value.
+    """
+    import numpy as np
+    if isinstance (value, np.ndarray):
+        return ['array', str (value.dtype), list (value.shape),
+                _canonical (value.ravel ().tolist ())]
+    if isinstance (value, np.generic):
+        value = value.item ()
+    if isinstance (value, (list, tuple)):
+        return list (_canonical (v) for v in value)
+    if isinstance (value, (bool, int, str)) or value is None:
+        return value
+    if isinstance (value, (float, complex)):
+        return repr (value)
+    return str (value)
+# >>>
+def fingerprint (qc): # <<<
+    """
+    Returns a hash (hexadecimal string) of the structure of the circuit
+    ``qc``: its registers and its instructions with their parameters,
+    (qu)bits and conditions.  Circuits that differ only in their name (or in
+    other metadata) have the same fingerprint.
+    """
+    import hashlib, json
+    def condition (op):
+        cond = getattr (op, 'condition', None)
+        if cond is None:
+            return None
+        target, value = cond
+        if hasattr (target, 'name'): # register
+            target = [target.name, target.size]
+        else:
+            target = qc.find_bit (target).index
+        return [target, _canonical (value)]
+    data = {
+        'qregs': list ([r.name, r.size] for r in qc.qregs),
+        'cregs': list ([r.name, r.size] for r in qc.cregs),
+        'num_qubits': qc.num_qubits,
+        'num_clbits': qc.num_clbits,
+        'global_phase': _canonical (qc.global_phase),
+        'data': list ([ci.operation.name,
+                       _canonical (ci.operation.params),
+                       list (qc.find_bit (q).index for q in ci.qubits),
+                       list (qc.find_bit (c).index for c in ci.clbits),
+                       condition (ci.operation)] for ci in qc.data),
+    }
+    return hashlib.sha256 (json.dumps (data, sort_keys = True)
+                           .encode ('utf-8')).hexdigest ()
+# >>>
+def run_key (qc, ** kwargs): # <<<
+    """
+    Returns the cache key for running the tuple of circuits ``qc`` with the
+    (JSON serializable) run arguments ``kwargs``, such as the shots, the seed
+    and the backend.
+    """
+    import hashlib, json
+    data = {'circuits': list (fingerprint (q) for q in qc),
+            'run': _canonical (sorted (kwargs.items ()))}
+    return hashlib.sha256 (json.dumps (data, sort_keys = True)
+                           .encode ('utf-8')).hexdigest ()
+# >>>
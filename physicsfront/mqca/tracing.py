@@ -0,0 +1,192 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+Lifecycle tracing of runs: the phases of a run (building circuits,
+submitting jobs, waiting, queueing and execution, fetching results,
+extracting memory and counting) are recorded as spans.
+
+A span is a :func:`dict` with the keys ``'name'`` (the phase), ``'run'`` (an
+identifier of the run), ``'start'`` (seconds since the epoch),
+``'duration'`` (seconds) and, where they apply, ``'circuit'`` and ``'job'``
+(indices into the circuits and jobs of the run).  The spans of a run are
+available as :attr:`physicsfront.mqca.experiment.Run.timings`, and are also
+passed, as they end, to the hooks added by :func:`add_hook`, such as
+:class:`JsonLinesSink` or :class:`OpenTelemetryHook`.
+
+Recording a span costs about a microsecond; with :func:`enable` (``False``),
+nothing is recorded at all.
+"""
+
+_enabled = True
+_hooks = []
+
+class JsonLinesSink (object): # <<<
+
+    """
+    A hook (see :func:`add_hook`) that appends each span, as a line of JSON,
+    to the file ``path``.
+    """
+
+    def __init__ (self, path):
+        import threading
+        self.path = path
+        self._lock = threading.Lock ()
+
+    def __call__ (self, span):
+        import json
+        line = json.dumps (span, default = repr) + '\n'
+        with self._lock:
+            with open (self.path, 'a', encoding = 'utf-8') as f:
+                f.write (line)
+
+# >>>
+class OpenTelemetryHook (object): # <<<
+
+    """
+    A hook (see :func:`add_hook`) that reports each span to OpenTelemetry
+    (package ``opentelemetry-api``, which is not a dependency of this
+    package), with the keys other than ``'name'``, ``'start'`` and
+    ``'duration'`` as attributes.
+
+    :param tracer:  An OpenTelemetry tracer; by default, the tracer of this
+        module from the global tracer provider.
+    """
+
+    def __init__ (self, tracer = None):
+        if tracer is None:
+            from opentelemetry import trace # pylint: disable=E0401
+            tracer = trace.get_tracer (__name__)
+        self.tracer = tracer
+
+    def __call__ (self, span):
+        start = int (span ['start'] * 1e9)
+        attributes = dict ((k, v) for k, v in span.items ()
+                           if k not in ('name', 'start', 'duration') and
+                           v is not None)
+        s = self.tracer.start_span (span ['name'], start_time = start,
+                                    attributes = attributes)
+        s.end (end_time = start + int (span ['duration'] * 1e9))
+
+# >>>
+class Tracer (object): # <<<
+
+    """
+    The recorder of the spans of one run.
+    """
+
+    def __init__ (self):
+        import uuid
+        self.run_id = uuid.uuid4 ().hex [: 12]
+        self.spans = []
+
+    def record (self, name, start, duration, ** attrs):
+        """
+        Records the span ``name`` that started at ``start`` (seconds since
+        the epoch) and lasted ``duration`` seconds, and passes it to the
+        hooks.
+        """
+        if not _enabled:
+            return
+        span = {'name': name, 'run': self.run_id, 'start': start,
+                'duration': duration}
+        span.update (attrs)
+        self.spans.append (span)
+        for hook in list (_hooks):
+            hook (span)
+
+    def span (self, name, ** attrs):
+        """
+        Returns a context manager that records the span ``name`` of the
+        code it runs.
+        """
+        if not _enabled:
+            return _NULL_SPAN
+        return _Span (self, name, attrs)
+
+# >>>
+class _NullSpan (object): # <<<
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, * exc_info):
+        return False
+
+    def set (self, ** attrs):
+        pass
+
+# >>>
+class _Span (object): # <<<
+
+    def __init__ (self, tracer, name, attrs):
+        self._tracer = tracer
+        self._name = name
+        self._attrs = attrs
+
+    def __enter__ (self):
+        import time
+        self._start = time.time ()
+        self._t0 = time.perf_counter ()
+        return self
+
+    def __exit__ (self, * exc_info):
+        import time
+        duration = time.perf_counter () - self._t0
+        self._tracer.record (self._name, self._start, duration, ** self._attrs)
+        return False
+
+    def set (self, ** attrs):
+        """
+        Sets attributes of this span (known only once its code ran).
+        """
+        self._attrs.update (attrs)
+
+# >>>
+
+_NULL_SPAN = _NullSpan ()
+
+def add_hook (hook): # <<<
+    """
+    Adds ``hook``, a callable that is called with each span (a :func:`dict`)
+    as it ends, in the thread in which it ends.
+    """
+    _hooks.append (hook)
+    return hook
+# >>>
+def enable (enabled = True): # <<<
+    """
+    Turns the recording of spans on (true value) or off (false value), and
+    returns whether it was on.
+    """
+    global _enabled # pylint: disable=W0603
+    ans = _enabled
+    _enabled = bool (enabled)
+    return ans
+# >>>
+def remove_hook (hook): # <<<
+    _hooks.remove (hook)
+# >>>
+def summarize (spans): # <<<
+    """
+    Returns a :func:`dict` that maps the name of each phase in ``spans`` to
+    its total duration (seconds), in the order the phases first occur.
+    """
+    ans = {}
+    for s in spans:
+        ans [s ['name']] = ans.get (s ['name'], 0.) + s ['duration']
+    return ans
+# >>>
@@ -0,0 +1,216 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+Cache of transpiled circuits, keyed on the structure of the circuit, the
+backend (and its calibration) and the optimization level.
+
+Circuits that differ only in their name (such as those built again with the
+same ``_dargs``, see :func:`~physicsfront.mqca.resultcache.fingerprint`)
+are transpiled once.  The transpiled circuits are held in memory and,
+optionally, in a directory (as QPY files), so that they are reused across
+processes too.  See ``physicsfront.mqca.experiment.transpile_cache``.
+"""
+
+class TranspileCache (object): # <<<
+
+    """
+    Transpiled circuits, at most ``maxsize`` of them in memory (least
+    recently used ones are evicted first), and all of them in ``directory``
+    if given.
+
+    ``hits`` and ``misses`` count the circuits looked up by
+    :meth:`transpile`, a hit being a circuit found in memory or on disk.
+    """
+
+    def __init__ (self, directory = None, maxsize = 256, enabled = True):
+        import os
+        from ._cache import LRUCache
+        self.directory = (os.path.expanduser (directory) if directory
+                          else None)
+        self.enabled = enabled
+        self._memory = LRUCache (maxsize = maxsize)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize (self):
+        return self._memory.maxsize
+
+    @maxsize.setter
+    def maxsize (self, value):
+        self._memory.maxsize = value
+        self._memory.trim ()
+
+    def _path (self, key):
+        import os
+        return os.path.join (self.directory, key + '.qpy')
+
+    def clear (self, disk = False):
+        """
+        Clears the circuits in memory (and, if ``disk``, the files in
+        ``directory``) and resets the statistics.
+        """
+        import os
+        self._memory.clear ()
+        if disk and self.directory:
+            try:
+                names = os.listdir (self.directory)
+            except FileNotFoundError:
+                names = ()
+            for name in names:
+                if name.endswith ('.qpy'):
+                    try:
+                        os.remove (os.path.join (self.directory, name))
+                    except FileNotFoundError:
+                        pass
+        self.hits = 0
+        self.misses = 0
+
+    def get (self, key):
+        """
+        Returns the transpiled circuit stored under ``key``, or ``None``.
+        """
+        from qiskit import qpy # pylint: disable=E0611
+        ans = self._memory.get (key)
+        if ans is not None or not self.directory:
+            return ans
+        try:
+            with open (self._path (key), 'rb') as f:
+                ans = qpy.load (f) [0]
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        self._memory.put (key, ans)
+        return ans
+
+    def info (self):
+        """
+        Returns a :func:`dict` with the keys ``'enabled'``, ``'directory'``,
+        ``'maxsize'``, ``'size'`` (the number of circuits in memory),
+        ``'hits'``, ``'misses'`` and ``'hit_rate'`` (``None`` before the
+        first lookup).
+        """
+        n = self.hits + self.misses
+        return {'enabled': self.enabled, 'directory': self.directory,
+                'maxsize': self.maxsize, 'size': len (self._memory),
+                'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / n if n else None}
+
+    def put (self, key, qc):
+        """
+        Stores the transpiled circuit ``qc`` under ``key``.
+        """
+        import os, tempfile
+        from qiskit import qpy # pylint: disable=E0611
+        self._memory.put (key, qc)
+        if not self.directory:
+            return
+        os.makedirs (self.directory, exist_ok = True)
+        fd, tmp = tempfile.mkstemp (dir = self.directory, suffix = '.tmp')
+        try:
+            with os.fdopen (fd, 'wb') as f:
+                qpy.dump (qc, f)
+            os.replace (tmp, self._path (key))
+        except BaseException:
+            os.remove (tmp)
+            raise
+
+    def transpile (self, qc, backend, optimization_level = 3):
+        """
+        Like qiskit ``transpile (qc, backend, optimization_level =
+        optimization_level)``, where ``qc`` is a circuit or a list of
+        circuits, but only the circuits that are not in this cache are
+        transpiled (all at once), and then stored in it.  The returned
+        circuits have the names of the given ones.
+        """
+        from qiskit import transpile # pylint: disable=E0611
+        single = not isinstance (qc, (list, tuple))
+        qcs = [qc] if single else list (qc)
+        if not self.enabled:
+            ans = transpile (qcs, backend,
+                             optimization_level = optimization_level)
+            return ans [0] if single else ans
+        keys = list (transpile_key (q, backend, optimization_level)
+                     for q in qcs)
+        ans = list (self.get (key) for key in keys)
+        todo = list (i for i, t in enumerate (ans) if t is None)
+        self.hits += len (qcs) - len (todo)
+        self.misses += len (todo)
+        if todo:
+            ##
+            # Circuits of the same structure (within this call) are
+            # transpiled only once.
+            ##
+            first = {} # key -> index of the first circuit with that key
+            for i in todo:
+                first.setdefault (keys [i], i)
+            new = dict (zip (first, transpile (list (qcs [i] for i
+                                                     in first.values ()),
+                                               backend,
+                                               optimization_level =
+                                               optimization_level)))
+            for key, t in new.items ():
+                self.put (key, t)
+            for i in todo:
+                ans [i] = new [keys [i]]
+        ans = list (t.copy (name = q.name) for t, q in zip (ans, qcs))
+        return ans [0] if single else ans
+
+# >>>
+
+def _calibration (backend): # <<<
+    """
+    Returns the time of the last calibration of ``backend`` (as a string),
+    or ``None`` if it is not known (such as for simulators).
+    """
+    properties = getattr (backend, 'properties', None)
+    if not callable (properties):
+        return None
+    try:
+        properties = properties ()
+    except Exception: # pylint: disable=W0703
+        return None
+    date = getattr (properties, 'last_update_date', None)
+    return None if date is None else str (date)
+# >>>
+def transpile_key (qc, backend, optimization_level): # <<<
+    """
+    Returns the cache key for transpiling the circuit ``qc`` for ``backend``
+    at ``optimization_level``: a hash of the structure of ``qc`` (see
+    :func:`~physicsfront.mqca.resultcache.fingerprint`), the name and
+    version of the backend, the time of its last calibration, the
+    optimization level and the qiskit version.
+
+    The layout chosen by the transpiler (at higher optimization levels)
+    depends on the calibration data of the backend, so that transpiled
+    circuits are not reused across calibrations.
+    """
+    import hashlib, json
+    import qiskit
+    from .resultcache import fingerprint
+    name = backend.name
+    if callable (name): # BackendV1
+        name = name ()
+    data = {'circuit': fingerprint (qc), 'backend': str (name),
+            'backend_version': str (getattr (backend, 'backend_version',
+                                             getattr (backend, 'version',
+                                                      None))),
+            'calibration': _calibration (backend),
+            'optimization_level': optimization_level,
+            'qiskit': qiskit.__version__}
+    return hashlib.sha256 (json.dumps (data, sort_keys = True)
+                           .encode ('utf-8')).hexdigest ()
+# >>>
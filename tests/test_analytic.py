@@ -0,0 +1,54 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+The analytic engine (``simulate = 'analytic'``) samples BB84 outcomes from
+the same distributions as the Aer simulator.
+"""
+
+import pytest
+
+import physicsfront.qiskit # pylint: disable=E0401,W0611 (for initialize)
+from physicsfront.mqca import experiment
+
+SHOTS = 4000
+TOLERANCE = .06 # several standard deviations at SHOTS shots
+
+def _bb84 (simulate, ** kwargs): # <<<
+    r = experiment.bb84 (simulate = simulate, shots = SHOTS, prep = 'gates',
+                         ** kwargs).wait (interval = .05)
+    counts = r.counts ()
+    n = sum (counts.values ())
+    return r.sift ().qber, dict ((k, v / n) for k, v in counts.items ())
+# >>>
+
+@pytest.mark.parametrize ('party3', ['evil_hacker', None])
+@pytest.mark.parametrize ('kind', [0, 1, 2, 3])
+def test_bb84_matches_aer (kind, party3): # <<<
+    qber_a, dist_a = _bb84 ('analytic', kind = kind, party3 = party3)
+    qber_s, dist_s = _bb84 (True, kind = kind, party3 = party3)
+    assert abs (qber_a - qber_s) < TOLERANCE
+    if not party3:
+        assert qber_a == qber_s == 0.
+    assert set (dist_a) == set (dist_s)
+    for k, p in dist_a.items ():
+        assert abs (p - dist_s [k]) < TOLERANCE, k
+# >>>
+def test_bb84_positional_arguments (): # <<<
+    r = experiment.bb84 ('secret_quantume_key', 'amar', 'juan',
+                         'evil_hacker', 'random', 'auto', 'analytic', 500, 7)
+    assert r.wait ().sift ().shots == 500
+# >>>
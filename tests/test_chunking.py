@@ -0,0 +1,95 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+The split of the shots over the circuits of a run is reproducible for a
+fixed seed, and the shots above ``max_shots`` are run in chunks, whose
+memory and counts the :class:`~physicsfront.mqca.experiment.Run` merges.
+"""
+
+import pytest
+
+import physicsfront.qiskit # pylint: disable=E0401,W0611 (for initialize)
+from physicsfront import mqca
+from physicsfront.mqca import experiment
+from physicsfront.mqca.analytic import LocalJob, LocalResult, run_analytic
+from physicsfront.mqca.memory import Memory
+
+def _circuits (): # <<<
+    return (mqca.qc_bb84 (), mqca.qc_for_random_bits (qubits = 2),
+            mqca.qc_for_random_bits ())
+# >>>
+def _unchunked (r): # <<<
+    """
+    Returns the (finalized) run of one job per circuit of ``r``, holding
+    the memory of its jobs concatenated in order.
+    """
+    jobs = tuple (LocalJob (LocalResult (Memory.concat (
+            Memory.from_result (r._part_result (p), b.layout)
+            for p in ps)))
+                  for ps, b in zip (r._parts, r._bits))
+    ans = experiment.Run (r._qc, jobs,
+                          take_value_if_single = r._take_value_if_single)
+    ans.finalize ()
+    return ans
+# >>>
+
+def test_split_reproducible (): # <<<
+    def split (seed):
+        r = experiment.run (_circuits (), simulate = 'analytic',
+                            shots = 10000, seed = seed)
+        r.finalize ()
+        return list (len (m) for m in r.memory)
+    assert split (7) == split (7)
+    assert split (7) != split (8)
+    assert sum (split (7)) == 10000
+# >>>
+@pytest.mark.parametrize ('batch', [False, True])
+def test_chunks_merged (batch): # <<<
+    r = experiment.run (_circuits (), simulate = 'analytic', shots = 3000,
+                        seed = 7, max_shots = 300, batch = batch)
+    assert len (r._job) > len (_circuits ())
+    r.finalize (compact = True)
+    u = _unchunked (r)
+    assert r.memory == u.memory
+    assert list (c () for c in r.counts) == list (c () for c in u.counts)
+    assert sum (len (m) for m in r.memory) == 3000
+# >>>
+def test_backend_max_shots (monkeypatch): # <<<
+    class Configuration (object):
+        max_shots = 300
+    class Backend (object):
+        def configuration (self):
+            return Configuration ()
+    chosen = []
+    submitted = []
+    def quantum_computer (qc):
+        chosen.append (qc)
+        return Backend ()
+    def run_quantum_computer (qc, backend, shots = 2000, tracer = None):
+        # pylint: disable=W0613
+        submitted.append ((backend, shots))
+        return run_analytic (qc, shots = shots)
+    monkeypatch.setattr (experiment, '_quantum_computer', quantum_computer)
+    monkeypatch.setattr (experiment, '_run_quantum_computer',
+                         run_quantum_computer)
+    r = experiment.run (mqca.qc_bb84 (), simulate = False, shots = 1000)
+    assert len (chosen) == 1
+    assert len (set (b for b, _ in submitted)) == 1
+    assert list (n for _, n in submitted) == [250] * 4
+    r.finalize ()
+    assert len (r.memory) == 1000
+# >>>
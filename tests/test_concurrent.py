@@ -0,0 +1,103 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+Concurrent submission (``run (concurrent = True)`` and ``run_async``) gives
+the same jobs, in the same order, as sequential submission, with at most
+``max_concurrency`` submissions in flight.  The analytic jobs (see
+:func:`~physicsfront.mqca.analytic.run_analytic`) stand in for a backend.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import physicsfront.qiskit # pylint: disable=E0401,W0611 (for initialize)
+from physicsfront import mqca
+from physicsfront.mqca import analytic, experiment
+
+def _circuits (): # <<<
+    return (mqca.qc_bb84 (), mqca.qc_for_random_bits (qubits = 2))
+# >>>
+def _run (** kwargs): # <<<
+    return experiment.run (_circuits (), simulate = 'analytic', shots = 1000,
+                           seed = 3, max_shots = 100, ** kwargs)
+# >>>
+def _job_memories (r): # <<<
+    return list (job.result ().memory_objects [0].to_strings ()
+                 for job in r._job)
+# >>>
+
+@pytest.fixture (name = 'in_flight')
+def _in_flight (monkeypatch): # <<<
+    """
+    Makes the analytic jobs slow to submit, and returns the list of the
+    numbers of submissions in flight, as seen by each submission.
+    """
+    run_analytic = analytic.run_analytic
+    lock = threading.Lock ()
+    current = [0]
+    seen = []
+    def slow (* args, ** kwargs):
+        with lock:
+            current [0] += 1
+            seen.append (current [0])
+        time.sleep (.02)
+        try:
+            return run_analytic (* args, ** kwargs)
+        finally:
+            with lock:
+                current [0] -= 1
+    monkeypatch.setattr (analytic, 'run_analytic', slow)
+    return seen
+# >>>
+
+def test_concurrent_same_as_sequential (): # <<<
+    sequential = _run ()
+    concurrent = _run (concurrent = True)
+    assert len (concurrent._job) == len (sequential._job) > 2
+    assert concurrent._parts == sequential._parts
+    assert _job_memories (concurrent) == _job_memories (sequential)
+    sequential.finalize ()
+    concurrent.finalize ()
+    assert concurrent.memory == sequential.memory
+    assert concurrent.counts [0] () == sequential.counts [0] ()
+# >>>
+def test_async_same_as_sequential (): # <<<
+    sequential = _run ()
+    r = asyncio.run (experiment.run_async (
+            _circuits (), simulate = 'analytic', shots = 1000, seed = 3,
+            max_shots = 100))
+    assert r._parts == sequential._parts
+    assert _job_memories (r) == _job_memories (sequential)
+    r.finalize ()
+    sequential.finalize ()
+    assert r.memory == sequential.memory
+# >>>
+def test_concurrent_max_concurrency (in_flight): # <<<
+    r = _run (concurrent = True, max_concurrency = 3)
+    assert len (in_flight) == len (r._job)
+    assert 1 < max (in_flight) <= 3
+# >>>
+def test_async_max_concurrency (in_flight): # <<<
+    r = asyncio.run (experiment.run_async (
+            _circuits (), simulate = 'analytic', shots = 1000, seed = 3,
+            max_shots = 100, max_concurrency = 2))
+    assert len (in_flight) == len (r._job)
+    assert 1 < max (in_flight) <= 2
+# >>>
@@ -0,0 +1,67 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+The counts of a :class:`~physicsfront.mqca.experiment.Run` (evaluated with
+compiled predicates over its memory) are those of
+:func:`~physicsfront.qiskit.gather_counts` on the same result.
+"""
+
+from collections import Counter
+
+import pytest
+
+import physicsfront.qiskit # pylint: disable=E0401 (also for initialize)
+from physicsfront import mqca
+from physicsfront.mqca import experiment
+
+QUERIES = [
+    ((), None, None),
+    (('amar_receives', 'juan_receives'), 'amar_prep_bit| == juan_prep_bit|',
+     None),
+    (('amar_receives', 'amar_prep_bit'), 'amar_prep_bit| != juan_prep_bit|',
+     ('00', '01', '10', '11', '22')),
+    ## not vectorized (evaluated shot by shot)
+    (('juan_receives', 'evil_hacker_listens'),
+     'amar_prep_bit| == "1" and juan_prep_bit| == "1"', None),
+]
+
+@pytest.fixture (name = 'run', scope = 'module')
+def _run (): # <<<
+    return experiment.run (mqca.qc_bb84 (prep = 'gates'), shots = 2000,
+                           seed = 5).wait (interval = .05)
+# >>>
+
+def test_counts_match_gather_counts (run): # <<<
+    expected = list (
+            Counter (physicsfront.qiskit.gather_counts (
+                    run.result, * clspecs, predicate = predicate,
+                    keys = keys))
+            for clspecs, predicate, keys in QUERIES)
+    assert run.gather_counts (QUERIES) == expected
+    assert run.counts () == expected [1]
+# >>>
+def test_redo_clears_counts_cache (): # <<<
+    r = experiment.run (mqca.qc_bb84 (prep = 'gates'), simulate = 'analytic',
+                        shots = 2000, seed = 5)
+    r.finalize ()
+    expected = r.counts ()
+    for ck in r._counts_cache:
+        r._counts_cache [ck] = Counter ({'stale': 1})
+    assert r.counts () == Counter ({'stale': 1})
+    r.finalize (redo = True)
+    assert r.counts () == expected
+# >>>
@@ -0,0 +1,65 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+The gate-native state preparation (``prep = 'gates'``) of the circuit
+builders prepares the same states as ``initialize`` (``prep =
+'initialize'``), with the same registers.
+"""
+
+import pytest
+
+import physicsfront.qiskit # pylint: disable=E0401,W0611 (for initialize)
+from physicsfront import mqca
+
+def _registers (qc): # <<<
+    return ([(r.name, r.size) for r in qc.qregs],
+            [(r.name, r.size) for r in qc.cregs])
+# >>>
+def _statevector (qc): # <<<
+    """
+    Returns the statevector of ``qc`` without its measurements (and without
+    the operations conditioned on them).
+    """
+    from qiskit.quantum_info import Statevector
+    q = qc.copy ()
+    q.data = [ci for ci in q.data if ci.operation.name != 'measure' and
+              getattr (ci.operation, 'condition', None) is None]
+    return Statevector (q)
+# >>>
+def _assert_equivalent (builder, ** kwargs): # <<<
+    a = builder (prep = 'initialize', ** kwargs)
+    b = builder (prep = 'gates', ** kwargs)
+    assert _registers (a) == _registers (b)
+    assert 'initialize' not in b.count_ops ()
+    assert _statevector (a).equiv (_statevector (b))
+# >>>
+
+@pytest.mark.parametrize ('kind', [0, 1, 2, 3])
+def test_entangle_two_qubits (kind): # <<<
+    _assert_equivalent (mqca.qc_entangle_two_qubits, kind = kind)
+# >>>
+@pytest.mark.parametrize ('qubits', [1, 3])
+def test_for_random_bits (qubits): # <<<
+    _assert_equivalent (mqca.qc_for_random_bits, qubits = qubits)
+# >>>
+def test_measure_qubit_random (): # <<<
+    _assert_equivalent (mqca.qc_measure_qubit, basis = 'random')
+# >>>
+def test_invalid_prep (): # <<<
+    with pytest.raises (ValueError):
+        mqca.qc_entangle_two_qubits (prep = 'reset')
+# >>>
@@ -0,0 +1,62 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+A second identical (deterministic) run with ``cache = True`` is served from
+the result cache, with the same memory.
+"""
+
+import pytest
+
+import physicsfront.qiskit # pylint: disable=E0401,W0611 (for initialize)
+from physicsfront import mqca
+from physicsfront.mqca import experiment
+from physicsfront.mqca.resultcache import ResultCache
+
+@pytest.mark.parametrize ('simulate', [True, 'analytic'])
+def test_run_hit (tmp_path, simulate): # <<<
+    cache = ResultCache (directory = str (tmp_path))
+    qc = (mqca.qc_bb84 (prep = 'gates'), mqca.qc_for_random_bits ())
+    first = experiment.run (qc, simulate = simulate, shots = 1000, seed = 9,
+                            cache = cache).wait (interval = .05)
+    assert (cache.hits, cache.misses, cache.info () ['entries']) == (0, 1, 1)
+    second = experiment.run (qc, simulate = simulate, shots = 1000, seed = 9,
+                             cache = cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert second.is_finalized
+    assert second.memory == first.memory
+    assert (list (c () for c in second.counts) ==
+            list (c () for c in first.counts))
+    experiment.run (qc, simulate = simulate, shots = 1000, seed = 10,
+                    cache = cache)
+    assert (cache.hits, cache.misses) == (1, 2)
+# >>>
+@pytest.mark.parametrize ('simulate', [True, 'analytic'])
+def test_bb84_classical_hit (tmp_path, simulate): # <<<
+    cache = ResultCache (directory = str (tmp_path))
+    def bb84 (basis_choice):
+        return experiment.bb84 (simulate = simulate, shots = 1000,
+                                basis_choice = basis_choice, cache = cache,
+                                prep = 'gates').wait (interval = .05)
+    first = bb84 ('classical')
+    second = bb84 ('classical')
+    assert (cache.hits, cache.misses, cache.info () ['entries']) == (1, 1, 1)
+    assert second.memory == first.memory
+    assert second.counts () == first.counts ()
+    assert second.sift ().qber == first.sift ().qber
+    bb84 ('quantum') # not the same run
+    assert (cache.hits, cache.misses) == (1, 2)
+# >>>
@@ -0,0 +1,96 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+:meth:`~physicsfront.mqca.experiment.Run.save` and
+:meth:`~physicsfront.mqca.experiment.Run.load` round-trip the circuits,
+their ``_dargs`` and the memory of a run.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+import physicsfront.qiskit # pylint: disable=E0401,W0611 (for initialize)
+from physicsfront import mqca
+from physicsfront.mqca import experiment
+from physicsfront.mqca.experiment import Run
+
+def _counts (r): # <<<
+    counts = r.counts
+    return (list (c () for c in counts) if isinstance (counts, tuple)
+            else counts ())
+# >>>
+def _circuits (r): # <<<
+    return r.qc if isinstance (r.qc, tuple) else (r.qc,)
+# >>>
+
+@pytest.mark.parametrize ('kwargs', [
+    {'simulate': True},
+    {'simulate': 'analytic', 'basis12': ('z', 'x')},
+    {'simulate': 'analytic', 'basis_choice': 'classical'},
+    {'simulate': 'analytic', 'pairs': 2},
+])
+def test_round_trip (tmp_path, kwargs): # <<<
+    path = str (tmp_path / 'run.npz')
+    r = experiment.bb84 (shots = 500, prep = 'gates', ** kwargs)
+    r.wait (interval = .05)
+    r.save (path)
+    loaded = Run.load (path)
+    assert loaded.is_finalized
+    assert loaded.memory == r.memory
+    assert _counts (loaded) == _counts (r)
+    assert (list (q._dargs for q in _circuits (loaded)) ==
+            list (q._dargs for q in _circuits (r)))
+    assert (list (q.name for q in _circuits (loaded)) ==
+            list (q.name for q in _circuits (r)))
+# >>>
+def test_round_trip_batch (tmp_path): # <<<
+    path = str (tmp_path / 'run.npz')
+    qc = (mqca.qc_for_random_bits (qubits = 2), mqca.qc_for_random_bits ())
+    r = experiment.run (qc, simulate = 'analytic', shots = 100,
+                        max_shots = 30, batch = True)
+    r.finalize ()
+    r.save (path)
+    loaded = Run.load (path)
+    assert loaded.memory == r.memory
+    assert _counts (loaded) == _counts (r)
+# >>>
+def test_unfinalized_local_raises (tmp_path): # <<<
+    r = experiment.run (mqca.qc_bb84 (), simulate = 'analytic', shots = 100)
+    with pytest.raises (ValueError):
+        r.save (str (tmp_path / 'run.npz'))
+# >>>
+def test_finalized_remote_needs_no_provider (tmp_path): # <<<
+    path = str (tmp_path / 'run.npz')
+    r = experiment.run (mqca.qc_bb84 (), simulate = 'analytic', shots = 100)
+    r.finalize ()
+    r.save (path)
+    ##
+    # Make the jobs look remote: they must not be retrieved (there is no
+    # provider here), since the circuit is finalized.
+    ##
+    with np.load (path) as f:
+        arrays = dict ((k, f [k]) for k in f.files)
+    meta = json.loads (str (arrays ['meta']))
+    meta ['jobs'] = list (['remote-job', False] for _ in meta ['jobs'])
+    arrays ['meta'] = np.array (json.dumps (meta))
+    with open (path, 'wb') as f:
+        np.savez (f, ** arrays)
+    loaded = Run.load (path)
+    assert loaded.memory == r.memory
+# >>>
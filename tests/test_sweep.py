@@ -0,0 +1,30 @@
+##
+# Copyright 2023 Physics Front LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+"""
+The table of :func:`~physicsfront.mqca.experiment.sweep` reports the shots
+submitted apart from the raw key bits.
+"""
+
+import physicsfront.qiskit # pylint: disable=E0401,W0611 (for initialize)
+from physicsfront.mqca import experiment
+
+def test_shots_and_raw_bits (): # <<<
+    t = experiment.sweep ({'pairs': [1, 3], 'shots': [1000]}, workers = 0,
+                          simulate = 'analytic')
+    assert t ['shots_run'].tolist () == [1000, 1000]
+    assert t ['raw_bits'].tolist () == [1000, 3000]
+# >>>